@@ -1,15 +1,101 @@
-import json
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import mmap
+import multiprocessing
 import os
+import re
+import struct
 import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
 
 import numpy as np
+import orjson
 from fastapi import FastAPI, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from PIL import Image, ImageOps
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+
+# Build-time compressed siblings (`app.js.br`, `app.js.gz`), in order of preference.
+PRECOMPRESSED_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+# Only text-like types get precompressed siblings; images etc. skip the sibling stats.
+PRECOMPRESSIBLE_EXTENSIONS = frozenset({".js", ".mjs", ".css", ".html", ".json", ".svg", ".txt", ".map"})
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Parse an Accept-Encoding header into the set of codings with non-zero q."""
+    accepted = set()
+    for token in accept_encoding.split(","):
+        coding, _, params = token.partition(";")
+        params = params.replace(" ", "")
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if coding.strip() and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _precompressed_response(
+    full_path: str,
+    accept_encoding: str,
+    status_code: int = 200,
+    *,
+    stat_file: Optional[Callable[[str], Optional[os.stat_result]]] = None,
+) -> Optional[Response]:
+    """Serve a precompressed sibling of `full_path` if one exists.
+
+    Returns None when the file has no `.br`/`.gz` sibling, or is not one of the
+    PRECOMPRESSIBLE_EXTENSIONS (no stat calls then), so callers fall back to
+    the plain file. When siblings exist the response always carries
+    `Vary: Accept-Encoding`, and the body is the best variant the client accepts.
+    `stat_file` (default: `os.stat`, None if missing) lets callers supply cached stats.
+    """
+    if os.path.splitext(full_path)[1].lower() not in PRECOMPRESSIBLE_EXTENSIONS:
+        return None
+    stat_file = stat_file or _stat_or_none
+    accepted = _accepted_encodings(accept_encoding) if accept_encoding else set()
+    has_variant = False
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+        variant_stat = stat_file(full_path + suffix)
+        if variant_stat is None:
+            continue
+        has_variant = True
+        if encoding in accepted:
+            media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+            resp = FileResponse(full_path + suffix, status_code=status_code, stat_result=variant_stat, media_type=media_type)
+            resp.headers["Content-Encoding"] = encoding
+            resp.headers["Vary"] = "Accept-Encoding"
+            return resp
+    if not has_variant:
+        return None
+    resp = FileResponse(full_path, status_code=status_code, stat_result=stat_file(full_path))
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (NumPy arrays are serialized natively)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
 
 
 class StaticFilesWithCache(StaticFiles):
@@ -25,21 +111,47 @@ class StaticFilesWithCache(StaticFiles):
         super().__init__(directory=directory, **kwargs)
         self.cache_control = cache_control
 
-    def file_response(self, *args: Any, **kwargs: Any) -> Response:
-        resp = super().file_response(*args, **kwargs)
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Any,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        resp = _precompressed_response(str(full_path), request_headers.get("accept-encoding", ""), status_code)
+        if resp is None:
+            resp = super().file_response(full_path, stat_result, scope, status_code)
+        elif self.is_not_modified(resp.headers, request_headers):
+            resp = NotModifiedResponse(resp.headers)
         resp.headers.setdefault("Cache-Control", self.cache_control)
         return resp
 
 # Path adjustment so `core/` can be imported when running from repo root.
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from core.bboxes import BBoxes
+from core.thumbnails import render_once, render_original_thumb, render_ortho_thumb, render_viewport, source_version
 from core.semantic_analyzer import SemanticAnalyzer
 
 DEMO_DATA_URL_PREFIX = "/demo_data"
 FLOORPLAN_SVG_URL_PREFIX = "/floorplan_svg"
 THUMB_URL_PREFIX = "/thumb"
+THUMB_CACHE_URL_PREFIX = "/thumb-cache"
 VIEWPORT_URL_PREFIX = "/viewport"
 VIEWPORT_MAX_SIZE = int(os.getenv("VIEWPORT_MAX_SIZE", "1920"))
+VIEWPORT_QUALITY = int(os.getenv("VIEWPORT_QUALITY", "85"))
+# Ortho thumbnails: fit within THUMB_MAX_W x THUMB_MAX_H, keeping aspect ratio.
+THUMB_MAX_W = int(os.getenv("THUMB_MAX_W", "720"))
+THUMB_MAX_H = int(os.getenv("THUMB_MAX_H", "480"))
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "75"))
+# Original-image thumbnails: center-cropped to exactly ORIG_THUMB_W x ORIG_THUMB_H (~10:7, good for facades).
+ORIG_THUMB_W = int(os.getenv("ORIG_THUMB_W", "600"))
+ORIG_THUMB_H = int(os.getenv("ORIG_THUMB_H", "420"))
+ORIG_THUMB_QUALITY = int(os.getenv("ORIG_THUMB_QUALITY", "72"))
+THUMB_CACHE_CONTROL = "public, max-age=604800"  # 7 days
+# Demo API payloads only change with the bundled files: cache at the edge, revalidate via ETag.
+API_CACHE_CONTROL = "public, s-maxage=86400, stale-while-revalidate=604800"
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 PUBLIC_DIR = REPO_ROOT / "public"
@@ -47,9 +159,38 @@ DEMO_DATA_DIR = Path(os.getenv("DEMO_DATA_DIR", str(PUBLIC_DIR / "demo_data"))).
 FRONTEND_DIST_DIR = (REPO_ROOT / "frontend" / "dist").resolve()
 FLOORPLAN_SVG_DIR = Path(os.getenv("FLOORPLAN_SVG_DIR", str(REPO_ROOT / "data" / "Untitled"))).resolve()
 THUMB_CACHE_DIR = Path(os.getenv("THUMB_CACHE_DIR", "/tmp/sgs_thumbs")).resolve()
+# Parsed demo annotations (.npz), so a cold process skips the JSON parse. Not web-served.
+DEMO_CACHE_DIR = Path(os.getenv("DEMO_CACHE_DIR", "/tmp/sgs_demo_cache")).resolve()
 DEMO_ORIGINAL_DIR = Path(os.getenv("DEMO_ORIGINAL_DIR", str(REPO_ROOT / "data" / "demo"))).resolve()
 # When set (e.g. https://cdn.example.com), demo image URLs are absolute OSS/CDN URLs instead of relative paths.
 DEMO_DATA_OSS_BASE = os.getenv("DEMO_DATA_OSS_BASE", "").rstrip("/")
+# On Vercel (without OSS) previews go through Vercel Image Optimization instead of the
+# serverless function; widths must be listed under `images.sizes` in vercel.json.
+ON_VERCEL = bool(os.getenv("VERCEL"))
+VERCEL_THUMB_WIDTH = 640
+VERCEL_PREVIEW_WIDTH = 1920
+
+
+def _check_jpeg_codec() -> None:
+    """Warn when Pillow is not linked against libjpeg-turbo.
+
+    Thumbnail/viewport generation is dominated by JPEG decode/encode; a Pillow
+    build without libjpeg-turbo is several times slower on that path.
+    """
+    try:
+        turbo_version = features.version_feature("libjpeg_turbo")
+    except Exception:
+        turbo_version = None
+    if turbo_version:
+        logger.info("Pillow JPEG codec: libjpeg-turbo %s", turbo_version)
+    else:
+        logger.warning(
+            "Pillow is not built against libjpeg-turbo; thumbnail/viewport generation will be slow. "
+            "Install a turbo-linked Pillow (see docs/SERVER_TROUBLESHOOTING.md)."
+        )
+
+
+_check_jpeg_codec()
 
 
 def _safe_resolve_under(root: Path, rel: str) -> Path:
@@ -82,15 +223,24 @@ def demo_asset_url(relative_path: str) -> str:
     return f"{DEMO_DATA_URL_PREFIX}/{normalized}"
 
 
+def _vercel_image_url(path: str, width: int, quality: int = 75) -> str:
+    """Return a Vercel Image Optimization URL that serves `path` resized to `width`."""
+    return f"/_vercel/image?url={quote(path, safe='')}&w={width}&q={quality}"
+
+
 def demo_thumbnail_url(case_id: str) -> str:
     """Return a thumbnail URL for the case selector grid."""
     if DEMO_DATA_OSS_BASE:
         return _demo_base(f"thumb/orig/{case_id}.jpg")
+    if ON_VERCEL:
+        return _vercel_image_url(demo_asset_url(_demo_original_filename(case_id)), VERCEL_THUMB_WIDTH)
     return f"{THUMB_URL_PREFIX}/orig/{case_id}.jpg"
 
 
 def demo_ortho_preview_url(case_id: str) -> str:
     """Return the ortho preview URL for the main viewport."""
+    if ON_VERCEL and not DEMO_DATA_OSS_BASE:
+        return _vercel_image_url(demo_asset_url(f"{case_id}_ortho.jpg"), VERCEL_PREVIEW_WIDTH)
     return demo_asset_url(f"{case_id}_ortho.jpg")
 
 
@@ -108,7 +258,23 @@ def demo_viewport_ortho_url(case_id: str) -> str:
     return f"{VIEWPORT_URL_PREFIX}/{case_id}/ortho"
 
 
-app = FastAPI(title="NewDemoFacade API")
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Precompute the case list and curated demo cases at startup; stop the render pool on shutdown."""
+    global _render_executor
+    await asyncio.to_thread(_cases_json, DEMO_DATA_DIR, DEMO_DATA_OSS_BASE, ON_VERCEL)
+    for case_id, _label in DEMO_FACADES:
+        try:
+            await asyncio.to_thread(_demo_case, case_id)
+        except HTTPException as e:
+            logger.warning("Demo case %s not precomputed: %s", case_id, e.detail)
+    yield
+    if _render_executor is not None:
+        _render_executor.shutdown(cancel_futures=True)
+        _render_executor = None
+
+
+app = FastAPI(title="NewDemoFacade API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # In integrated deployments, the frontend is served from the same origin, so CORS
 # is only needed for local Vite dev (http://localhost:5173).
@@ -121,176 +287,269 @@ app.add_middleware(
 )
 
 
+# SOFn markers carry the frame size; 0xC4 (DHT), 0xC8 (JPG) and 0xCC (DAC) share the range.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(path: Path) -> Optional[List[int]]:
+    """Return [width, height] from a JPEG's SOF segment without decoding it.
+
+    Walks the marker segments from the start of the file (skipping APPn/EXIF
+    payloads) and stops at the first SOFn. Returns None for non-JPEG input or if
+    no frame header precedes the scan data.
+    """
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            byte = f.read(1)
+            while byte and byte != b"\xff":
+                byte = f.read(1)
+            while byte == b"\xff":
+                byte = f.read(1)
+            if not byte:
+                return None
+            marker = byte[0]
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                continue  # standalone markers have no length field
+            if marker == 0xDA:
+                return None  # start of scan: no SOF found
+            header = f.read(2)
+            if len(header) < 2:
+                return None
+            (length,) = struct.unpack(">H", header)
+            if marker in _JPEG_SOF_MARKERS:
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                _precision, h, w = struct.unpack(">BHH", frame)
+                return [int(w), int(h)]
+            f.seek(length - 2, os.SEEK_CUR)
+
+
 def _image_size(path: Path) -> List[int]:
     """Return image size as [width, height]."""
+    size = _jpeg_size(path)
+    if size is not None:
+        return size
     with Image.open(path) as img:
         w, h = img.size
     return [int(w), int(h)]
 
 
+def _stat_or_none(path: Path) -> Optional[os.stat_result]:
+    """Return `os.stat(path)`, or None if the file does not exist."""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _stat_original_source(case_id: str) -> Tuple[Path, Optional[os.stat_result]]:
+    """Locate the ORIGINAL image for `case_id` (originals dir first, then demo_data)."""
+    src = DEMO_ORIGINAL_DIR / f"{case_id}.JPG"
+    src_st = _stat_or_none(src)
+    if src_st is None:
+        src = DEMO_DATA_DIR / f"{case_id}.JPG"
+        src_st = _stat_or_none(src)
+    return src, src_st
+
+
+# (case_id, kind) -> (checked_at, source path, source version). Lets warm cache hits skip
+# stat-ing the multi-MB source; a replaced source is picked up within the TTL.
+SOURCE_STAT_TTL = float(os.getenv("SOURCE_STAT_TTL", "300"))
+_source_versions: Dict[Tuple[str, str], Tuple[float, Path, str]] = {}
+
+
+def _locate_source(case_id: str, kind: str) -> Optional[Tuple[Path, str]]:
+    """Return (path, version) of the 'ortho' or 'original' source image, or None if missing.
+
+    The version (`source_version`: mtime_ns + size) is embedded in cache filenames, so a
+    cache hit is a single stat of the cached file and stale renders never match.
+    """
+    now = time.monotonic()
+    cached = _source_versions.get((case_id, kind))
+    if cached is not None and now - cached[0] < SOURCE_STAT_TTL:
+        return cached[1], cached[2]
+
+    if kind == "original":
+        src, src_st = _stat_original_source(case_id)
+    else:
+        src = DEMO_DATA_DIR / f"{case_id}_ortho.jpg"
+        src_st = _stat_or_none(src)
+    if src_st is None:
+        _source_versions.pop((case_id, kind), None)
+        return None
+    version = source_version(src_st)
+    _source_versions[(case_id, kind)] = (now, src, version)
+    return src, version
+
+
+_render_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_render_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool for thumbnail/viewport rendering (created on first use).
+
+    The pool is created inside the running server, which already has threads, so
+    workers come from a forkserver instead of fork()ing this process.
+    """
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ProcessPoolExecutor(
+            max_workers=int(os.getenv("RENDER_WORKERS", "2")),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _render_executor
+
+
+def _reset_render_executor(broken: ProcessPoolExecutor) -> None:
+    """Drop a broken render pool so the next `_get_render_executor()` builds a fresh one."""
+    global _render_executor
+    if _render_executor is broken:
+        _render_executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def _ensure_rendered(render: Callable[[Path, Path], None], src: Path, dst: Path, prefix: str) -> None:
+    """Render `dst` from `src` in the process pool if it is not cached yet.
+
+    If a worker died (e.g. OOM-killed on a huge ortho) the pool is broken for good;
+    it is replaced and the render retried once.
+    """
+    if dst.exists():
+        return
+    loop = asyncio.get_running_loop()
+    executor = _get_render_executor()
+    try:
+        await loop.run_in_executor(executor, render_once, render, src, dst, prefix)
+    except BrokenProcessPool:
+        logger.warning("Render pool broken while rendering %s; restarting it", dst.name)
+        _reset_render_executor(executor)
+        await loop.run_in_executor(_get_render_executor(), render_once, render, src, dst, prefix)
+
+
+def _redirect_to_cache(dst: Path) -> Response:
+    """Redirect to a generated JPEG on the THUMB_CACHE_URL_PREFIX static mount.
+
+    Cache filenames are versioned by the source version, so the static copy is immutable
+    and StaticFiles handles ETag/304 and sendfile for it; the redirect itself is
+    only cached as long as the source lookup is (SOURCE_STAT_TTL).
+    """
+    return RedirectResponse(
+        f"{THUMB_CACHE_URL_PREFIX}/{dst.name}",
+        status_code=307,
+        headers={"Cache-Control": f"public, max-age={int(SOURCE_STAT_TTL)}"},
+    )
+
+
+def _not_modified(etag: str, cache_control: str = THUMB_CACHE_CONTROL) -> Response:
+    """Return a bodyless 304 for a resource whose ETag the client already holds.
+
+    Generated images are named `<prefix>_<src_version>.jpg` and their ETag is that
+    stem, so revalidation is answered from the source version alone.
+    """
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Return True if the request's If-None-Match covers `etag` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
 @app.get(f"{THUMB_URL_PREFIX}" + "/{case_id}.jpg")
 async def get_thumb(case_id: str) -> Response:
     """Serve a cached downscaled JPEG thumbnail for the ortho image."""
-    src = DEMO_DATA_DIR / f"{case_id}_ortho.jpg"
-    if not src.exists():
+    located = _locate_source(case_id, "ortho")
+    if located is None:
         raise HTTPException(status_code=404, detail="Ortho image not found")
 
-    THUMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    dst = THUMB_CACHE_DIR / f"{case_id}_ortho_thumb.jpg"
+    src, src_version = located
+    prefix = f"{case_id}_ortho_thumb"
+    dst = THUMB_CACHE_DIR / f"{prefix}_{src_version}.jpg"
+    await _ensure_rendered(
+        partial(render_ortho_thumb, max_w=THUMB_MAX_W, max_h=THUMB_MAX_H, quality=THUMB_QUALITY), src, dst, prefix
+    )
+    return _redirect_to_cache(dst)
 
-    try:
-        src_mtime = src.stat().st_mtime
-        dst_mtime = dst.stat().st_mtime if dst.exists() else 0
-    except Exception:
-        src_mtime = 0
-        dst_mtime = 0
-
-    if (not dst.exists()) or (dst_mtime < src_mtime):
-        with Image.open(src) as img:
-            img = img.convert("RGB")
-            w, h = img.size
-
-            # Limit both width/height; keep aspect ratio.
-            max_w = int(os.getenv("THUMB_MAX_W", "720"))
-            max_h = int(os.getenv("THUMB_MAX_H", "480"))
-            scale = min(max_w / max(w, 1), max_h / max(h, 1), 1.0)
-            new_w = max(1, int(w * scale))
-            new_h = max(1, int(h * scale))
-            resampling = getattr(Image, "Resampling", Image)
-            img = img.resize((new_w, new_h), resampling.LANCZOS)
-
-            img.save(
-                dst,
-                format="JPEG",
-                quality=int(os.getenv("THUMB_QUALITY", "75")),
-                optimize=True,
-                progressive=False,
-            )
-
-    response = FileResponse(str(dst), media_type="image/jpeg")
-    response.headers["Cache-Control"] = "public, max-age=604800"  # 7 days
-    return response
+
+@lru_cache(maxsize=64)
+def _cached_file_bytes(path: Path) -> bytes:
+    """Return the bytes of an immutable (versioned) cache file, memoized in RAM.
+
+    The case-selector modal loads every original thumbnail on every visit, and
+    they are small enough to pin.
+    """
+    return path.read_bytes()
 
 
 @app.get(f"{THUMB_URL_PREFIX}" + "/orig/{case_id}.jpg")
-async def get_thumb_original(case_id: str) -> Response:
+async def get_thumb_original(case_id: str, request: Request) -> Response:
     """Serve a cached, center-cropped thumbnail for the ORIGINAL image.
 
     This is optimized for the "Select Building" modal: consistent aspect ratio,
     small payload, and no progressive scanning.
     """
     # Prefer the user-specified originals directory; fall back to repo demo_data.
-    src = DEMO_ORIGINAL_DIR / f"{case_id}.JPG"
-    if not src.exists():
-        src = DEMO_DATA_DIR / f"{case_id}.JPG"
-    if not src.exists():
+    located = _locate_source(case_id, "original")
+    if located is None:
         raise HTTPException(status_code=404, detail="Original image not found")
 
-    THUMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    dst = THUMB_CACHE_DIR / f"{case_id}_orig_thumb_600x420.jpg"
+    src, src_version = located
+    prefix = f"{case_id}_orig_thumb_{ORIG_THUMB_W}x{ORIG_THUMB_H}"
+    dst = THUMB_CACHE_DIR / f"{prefix}_{src_version}.jpg"
+    etag = f'"{dst.stem}"'
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
 
     try:
-        src_mtime = src.stat().st_mtime
-        dst_mtime = dst.stat().st_mtime if dst.exists() else 0
-    except Exception:
-        src_mtime = 0
-        dst_mtime = 0
-
-    if (not dst.exists()) or (dst_mtime < src_mtime):
-        with Image.open(src) as img:
-            # Correct EXIF orientation (these originals are rotated in metadata).
-            img = ImageOps.exif_transpose(img)
-            img = img.convert("RGB")
-
-            target_w = int(os.getenv("ORIG_THUMB_W", "600"))
-            target_h = int(os.getenv("ORIG_THUMB_H", "420"))  # ~10:7, good for building facades
-
-            w, h = img.size
-            scale = max(target_w / max(w, 1), target_h / max(h, 1))
-            new_w = max(1, int(w * scale))
-            new_h = max(1, int(h * scale))
-            resampling = getattr(Image, "Resampling", Image)
-            img = img.resize((new_w, new_h), resampling.LANCZOS)
-
-            # Center crop.
-            left = max(0, (new_w - target_w) // 2)
-            top = max(0, (new_h - target_h) // 2)
-            img = img.crop((left, top, left + target_w, top + target_h))
-
-            img.save(
-                dst,
-                format="JPEG",
-                quality=int(os.getenv("ORIG_THUMB_QUALITY", "72")),
-                optimize=True,
-                progressive=False,
-            )
-
-    response = FileResponse(str(dst), media_type="image/jpeg")
-    response.headers["Cache-Control"] = "public, max-age=604800"  # 7 days
-    return response
-
-
-def _serve_viewport_image(case_id: str, kind: str) -> Response:
+        body = _cached_file_bytes(dst)
+    except FileNotFoundError:
+        await _ensure_rendered(
+            partial(render_original_thumb, width=ORIG_THUMB_W, height=ORIG_THUMB_H, quality=ORIG_THUMB_QUALITY),
+            src,
+            dst,
+            prefix,
+        )
+        body = _cached_file_bytes(dst)
+    return Response(body, media_type="image/jpeg", headers={"ETag": etag, "Cache-Control": THUMB_CACHE_CONTROL})
+
+
+async def _serve_viewport_image(case_id: str, kind: str) -> Response:
     """Generate or serve a cached viewport-sized (max edge VIEWPORT_MAX_SIZE) image.
 
-    kind is 'original' or 'ortho'. Returns a FileResponse with Cache-Control.
+    kind is 'original' or 'ortho'. Returns a redirect to the static cache mount.
     """
-    if kind == "original":
-        src = DEMO_ORIGINAL_DIR / f"{case_id}.JPG"
-        if not src.exists():
-            src = DEMO_DATA_DIR / f"{case_id}.JPG"
-        cache_name = f"{case_id}_viewport_orig_{VIEWPORT_MAX_SIZE}.jpg"
-    else:
-        src = DEMO_DATA_DIR / f"{case_id}_ortho.jpg"
-        cache_name = f"{case_id}_viewport_ortho_{VIEWPORT_MAX_SIZE}.jpg"
-
-    if not src.exists():
+    located = _locate_source(case_id, kind)
+    if located is None:
         raise HTTPException(status_code=404, detail=f"Image not found for case {case_id}")
 
-    THUMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    dst = THUMB_CACHE_DIR / cache_name
-
-    try:
-        src_mtime = src.stat().st_mtime
-        dst_mtime = dst.stat().st_mtime if dst.exists() else 0
-    except Exception:
-        src_mtime = 0
-        dst_mtime = 0
-
-    if (not dst.exists()) or (dst_mtime < src_mtime):
-        with Image.open(src) as img:
-            if kind == "original":
-                img = ImageOps.exif_transpose(img)
-            img = img.convert("RGB")
-            w, h = img.size
-            scale = min(VIEWPORT_MAX_SIZE / max(w, 1), VIEWPORT_MAX_SIZE / max(h, 1), 1.0)
-            new_w = max(1, int(w * scale))
-            new_h = max(1, int(h * scale))
-            resampling = getattr(Image, "Resampling", Image)
-            img = img.resize((new_w, new_h), resampling.LANCZOS)
-            img.save(
-                dst,
-                format="JPEG",
-                quality=int(os.getenv("VIEWPORT_QUALITY", "85")),
-                optimize=True,
-                progressive=True,
-            )
-
-    response = FileResponse(str(dst), media_type="image/jpeg")
-    response.headers["Cache-Control"] = "public, max-age=604800"  # 7 days
-    return response
+    src, src_version = located
+    prefix = f"{case_id}_viewport_{'orig' if kind == 'original' else 'ortho'}_{VIEWPORT_MAX_SIZE}"
+    dst = THUMB_CACHE_DIR / f"{prefix}_{src_version}.jpg"
+    render = partial(
+        render_viewport, max_size=VIEWPORT_MAX_SIZE, quality=VIEWPORT_QUALITY, exif_transpose=(kind == "original")
+    )
+    await _ensure_rendered(render, src, dst, prefix)
+    return _redirect_to_cache(dst)
 
 
 @app.get(f"{VIEWPORT_URL_PREFIX}" + "/{case_id}/original")
 async def get_viewport_original(case_id: str) -> Response:
     """Serve a viewport-sized (max edge 1920px) original image for the main view."""
-    return _serve_viewport_image(case_id, "original")
+    return await _serve_viewport_image(case_id, "original")
 
 
 @app.get(f"{VIEWPORT_URL_PREFIX}" + "/{case_id}/ortho")
 async def get_viewport_ortho(case_id: str) -> Response:
     """Serve a viewport-sized (max edge 1920px) ortho image for the main view."""
-    return _serve_viewport_image(case_id, "ortho")
+    return await _serve_viewport_image(case_id, "ortho")
 
 
 if DEMO_DATA_DIR.exists():
@@ -300,17 +559,25 @@ if DEMO_DATA_DIR.exists():
         name="demo_data",
     )
 
+# Generated thumbnails/viewports; names embed the source version, so they never change.
+THUMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+app.mount(
+    THUMB_CACHE_URL_PREFIX,
+    StaticFilesWithCache(directory=str(THUMB_CACHE_DIR), cache_control="public, max-age=604800, immutable"),
+    name="thumb_cache",
+)
+
 if FLOORPLAN_SVG_DIR.exists():
     app.mount(
         FLOORPLAN_SVG_URL_PREFIX,
-        StaticFiles(directory=str(FLOORPLAN_SVG_DIR)),
+        StaticFilesWithCache(directory=str(FLOORPLAN_SVG_DIR), cache_control="public, max-age=86400"),
         name="floorplan_svg",
     )
 
 
 # IMPORTANT: keep server memory footprint low.
-# - `core.image_processor` can import OpenCV and optionally torch/transformers.
-# - `core.layout_generator` imports ezdxf.
+# - `core.image_processor` imports OpenCV (and optionally torch/transformers) when used.
+# - `core.layout_generator` imports ezdxf when generating a DXF.
 # For the local demo API, we only need `SemanticAnalyzer`, so we avoid importing
 # heavy modules at startup. If/when you re-add upload/DXF endpoints, import and
 # initialize them inside those endpoint functions.
@@ -322,23 +589,36 @@ STRUCTURAL_CONFIG_PATH = Path(
 ).resolve()
 
 
+# Raw bytes of the last-read config, keyed by (st_mtime_ns, st_size) of the file.
+_structural_config_cache: Dict[str, Any] = {"key": None, "body": b""}
+
+
 @app.get("/api/structural_config")
-async def get_structural_config() -> Dict[str, Any]:
+async def get_structural_config() -> Response:
     """Return the current structural elements configuration (floorplan_3d_config.json)."""
-    if not STRUCTURAL_CONFIG_PATH.exists():
-        return {"wallHeight": 2.8, "floorHeight": 3.0, "structuralElements": {"columns": [], "beams": [], "shearWalls": []}}
     try:
-        data = json.loads(STRUCTURAL_CONFIG_PATH.read_text(encoding="utf-8"))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to read config: {e}") from e
-    return data
+        st = STRUCTURAL_CONFIG_PATH.stat()
+    except FileNotFoundError:
+        return ORJSONResponse(
+            {"wallHeight": 2.8, "floorHeight": 3.0, "structuralElements": {"columns": [], "beams": [], "shearWalls": []}}
+        )
+
+    key = (st.st_mtime_ns, st.st_size)
+    if _structural_config_cache["key"] != key:
+        try:
+            body = STRUCTURAL_CONFIG_PATH.read_bytes()
+            orjson.loads(body)  # validate once per file version
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to read config: {e}") from e
+        _structural_config_cache.update(key=key, body=body)
+    return Response(_structural_config_cache["body"], media_type="application/json")
 
 
 @app.post("/api/structural_config")
 async def save_structural_config(request: Request) -> Dict[str, str]:
     """Save structural elements configuration to floorplan_3d_config.json."""
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}") from e
 
@@ -347,70 +627,57 @@ async def save_structural_config(request: Request) -> Dict[str, str]:
         raise HTTPException(status_code=400, detail="Body must be a JSON object")
 
     STRUCTURAL_CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    STRUCTURAL_CONFIG_PATH.write_text(json.dumps(body, indent=2, ensure_ascii=False), encoding="utf-8")
+    encoded = orjson.dumps(body, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    STRUCTURAL_CONFIG_PATH.write_bytes(encoded)
+    st = STRUCTURAL_CONFIG_PATH.stat()
+    _structural_config_cache.update(key=(st.st_mtime_ns, st.st_size), body=encoded)
     return {"status": "saved"}
 
 
+_HEALTH_BODY = b'{"status":"ok"}'
+
+
 @app.get("/api/health")
-async def health() -> Dict[str, str]:
+async def health() -> Response:
     """Return a simple health check payload."""
-    return {"status": "ok"}
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 
-@app.get("/api/cases")
-async def get_cases() -> List[Dict[str, Any]]:
-    """Return the curated demo cases shown in the UI (local-only assets)."""
+# Curated demo facades shown in the UI: (case_id, label).
+DEMO_FACADES = (
+    ("IMG_1397", "北外立面"),
+    ("IMG_1398", "西外立面"),
+    ("IMG_1399", "南外立面"),
+)
+
+
+def _build_cases_payload() -> List[Dict[str, Any]]:
+    """Build the `/api/cases` payload (local-only assets)."""
     # Include image dimensions so the frontend can preserve aspect ratios without
     # forcing the browser to decode huge JPEGs for layout.
-    dims: Dict[str, Dict[str, list[int]]] = {}
-    for case_id in ["IMG_1397", "IMG_1398", "IMG_1399"]:
-        dims[case_id] = {}
+    facades: List[Dict[str, Any]] = []
+    for case_id, label in DEMO_FACADES:
         ortho_path = DEMO_DATA_DIR / f"{case_id}_ortho.jpg"
         orig_path = DEMO_DATA_DIR / f"{case_id}.JPG"
-        if ortho_path.exists():
-            dims[case_id]["ortho"] = _image_size(ortho_path)
-        if orig_path.exists():
-            dims[case_id]["original"] = _image_size(orig_path)
+        facades.append(
+            {
+                "id": case_id,
+                "label": label,
+                "thumbnail": demo_thumbnail_url(case_id),
+                "ortho_image": demo_ortho_preview_url(case_id),
+                "original_image": demo_asset_url(_demo_original_filename(case_id)),
+                "viewport_original_url": demo_viewport_original_url(case_id),
+                "viewport_ortho_url": demo_viewport_ortho_url(case_id),
+                "ortho_dims": _image_size(ortho_path) if ortho_path.exists() else None,
+                "original_dims": _image_size(orig_path) if orig_path.exists() else None,
+            }
+        )
 
     return [
         {
             "id": "BUILDING_001",
             "name": "Demo Building",
-            "facades": [
-                {
-                    "id": "IMG_1397",
-                    "label": "北外立面",
-                    "thumbnail": demo_thumbnail_url("IMG_1397"),
-                    "ortho_image": demo_ortho_preview_url("IMG_1397"),
-                    "original_image": demo_asset_url(_demo_original_filename("IMG_1397")),
-                    "viewport_original_url": demo_viewport_original_url("IMG_1397"),
-                    "viewport_ortho_url": demo_viewport_ortho_url("IMG_1397"),
-                    "ortho_dims": dims.get("IMG_1397", {}).get("ortho"),
-                    "original_dims": dims.get("IMG_1397", {}).get("original"),
-                },
-                {
-                    "id": "IMG_1398",
-                    "label": "西外立面",
-                    "thumbnail": demo_thumbnail_url("IMG_1398"),
-                    "ortho_image": demo_ortho_preview_url("IMG_1398"),
-                    "original_image": demo_asset_url(_demo_original_filename("IMG_1398")),
-                    "viewport_original_url": demo_viewport_original_url("IMG_1398"),
-                    "viewport_ortho_url": demo_viewport_ortho_url("IMG_1398"),
-                    "ortho_dims": dims.get("IMG_1398", {}).get("ortho"),
-                    "original_dims": dims.get("IMG_1398", {}).get("original"),
-                },
-                {
-                    "id": "IMG_1399",
-                    "label": "南外立面",
-                    "thumbnail": demo_thumbnail_url("IMG_1399"),
-                    "ortho_image": demo_ortho_preview_url("IMG_1399"),
-                    "original_image": demo_asset_url(_demo_original_filename("IMG_1399")),
-                    "viewport_original_url": demo_viewport_original_url("IMG_1399"),
-                    "viewport_ortho_url": demo_viewport_ortho_url("IMG_1399"),
-                    "ortho_dims": dims.get("IMG_1399", {}).get("ortho"),
-                    "original_dims": dims.get("IMG_1399", {}).get("original"),
-                },
-            ],
+            "facades": facades,
             # Shared building-level metadata used by the UI.
             "step1_info": {
                 "structure": "RC Frame",
@@ -428,9 +695,251 @@ async def get_cases() -> List[Dict[str, Any]]:
     ]
 
 
-@app.post("/api/analyze_demo")
-async def analyze_demo(_request: Request, case_id: str = Form(...)) -> Dict[str, Any]:
-    """Analyze a bundled demo case and return the computed results (local-only)."""
+@lru_cache(maxsize=4)
+def _cases_json(demo_data_dir: Path, oss_base: str, on_vercel: bool) -> Tuple[bytes, str]:
+    """Serialized `/api/cases` payload and its ETag.
+
+    The case list is static for the process lifetime, so it is built once instead of
+    re-reading six image headers on every request. `_build_cases_payload` reads the
+    module globals; they are passed here only as the cache key, so a patched
+    `DEMO_DATA_DIR` / `DEMO_DATA_OSS_BASE` / `ON_VERCEL` (e.g. in tests) gets its own entry.
+    """
+    body = orjson.dumps(_build_cases_payload())
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+@app.get("/api/cases")
+async def get_cases(request: Request) -> Response:
+    """Return the curated demo cases shown in the UI (local-only assets)."""
+    body, etag = _cases_json(DEMO_DATA_DIR, DEMO_DATA_OSS_BASE, ON_VERCEL)
+    if _etag_matches(request, etag):
+        return _not_modified(etag, API_CACHE_CONTROL)
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": API_CACHE_CONTROL},
+    )
+
+
+def _load_json_file(path: Path) -> Any:
+    """Parse a (potentially multi-MB) JSON file with orjson straight from an mmap."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+COUNT_CATEGORIES = ("window", "ac", "door", "other")
+
+
+@lru_cache(maxsize=None)
+def _count_category(label: str) -> int:
+    """Map a shape label to its `counts` bucket index (substring match, memoized per label)."""
+    for idx, category in enumerate(COUNT_CATEGORIES[:-1]):
+        if category in label:
+            return idx
+    return len(COUNT_CATEGORIES) - 1
+
+
+def _bbox_reduce_loop(points: np.ndarray, offsets: np.ndarray, category_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-polygon `(x, y, w, h)` boxes plus category counts in a single pass.
+
+    `points` is the (M, 2) vertex array of all polygons, polygon `i` spanning
+    `points[offsets[i]:offsets[i + 1]]`. Written as plain loops so Numba can compile it.
+    """
+    n = offsets.shape[0] - 1
+    boxes = np.empty((n, 4), dtype=np.int64)
+    counts = np.zeros(len(COUNT_CATEGORIES), dtype=np.int64)
+    for i in range(n):
+        start = offsets[i]
+        x_min = x_max = points[start, 0]
+        y_min = y_max = points[start, 1]
+        for j in range(start + 1, offsets[i + 1]):
+            x = points[j, 0]
+            y = points[j, 1]
+            if x < x_min:
+                x_min = x
+            elif x > x_max:
+                x_max = x
+            if y < y_min:
+                y_min = y
+            elif y > y_max:
+                y_max = y
+        boxes[i, 0] = int(x_min)
+        boxes[i, 1] = int(y_min)
+        boxes[i, 2] = int(x_max - x_min)
+        boxes[i, 3] = int(y_max - y_min)
+        counts[category_ids[i]] += 1
+    return boxes, counts
+
+
+def _bbox_reduce_numpy(points: np.ndarray, offsets: np.ndarray, category_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """NumPy fallback for `_bbox_reduce_loop` when Numba is unavailable."""
+    mins = np.minimum.reduceat(points, offsets[:-1], axis=0)
+    maxs = np.maximum.reduceat(points, offsets[:-1], axis=0)
+    boxes = np.hstack((mins, maxs - mins)).astype(np.int64)
+    counts = np.bincount(category_ids, minlength=len(COUNT_CATEGORIES))
+    return boxes, counts
+
+
+_bbox_reduce: Optional[Callable[..., Tuple[np.ndarray, np.ndarray]]] = None
+
+
+def _get_bbox_reduce() -> Callable[..., Tuple[np.ndarray, np.ndarray]]:
+    """Return `_bbox_reduce_loop` compiled with Numba, or the NumPy fallback without it.
+
+    numba is imported on first use rather than at module load: the import alone adds
+    ~150 ms to cold start, and only demo parsing needs it.
+    """
+    global _bbox_reduce
+    if _bbox_reduce is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _bbox_reduce = _bbox_reduce_numpy
+        else:
+            _bbox_reduce = njit(cache=True, boundscheck=False)(_bbox_reduce_loop)
+    return _bbox_reduce
+
+
+def _polygons_to_boxes(labels: List[str], point_lists: List[Any]) -> Tuple[BBoxes, Dict[str, int]]:
+    """Reduce polygons to integer `BBoxes` (labels + an (N, 4) int32 `xywh`) and per-category counts.
+
+    All vertices are packed into a single (M, 2) array and handed to `_get_bbox_reduce()`
+    (a Numba kernel when available, `reduceat` otherwise). When every polygon has the
+    same vertex count (e.g. labelme 2-point rectangles) the points are stacked into an
+    (N, K, 2) array and reduced along axis 1 instead. Polygons without points are
+    skipped and not counted.
+    """
+    counts = dict.fromkeys(COUNT_CATEGORIES, 0)
+    keep = [i for i, pts in enumerate(point_lists) if len(pts)]
+    if not keep:
+        return BBoxes([], np.empty((0, 4), dtype=np.int32)), counts
+    lengths = [len(point_lists[i]) for i in keep]
+    category_ids = np.fromiter((_count_category(labels[i]) for i in keep), dtype=np.intp, count=len(keep))
+    if min(lengths) == max(lengths):
+        stacked = np.array([point_lists[i] for i in keep], dtype=np.float64)
+        mins, maxs = stacked.min(axis=1), stacked.max(axis=1)
+        boxes = np.hstack((mins, maxs - mins)).astype(np.int64)
+        totals = np.bincount(category_ids, minlength=len(COUNT_CATEGORIES))
+    else:
+        all_points = np.array(list(chain.from_iterable(point_lists[i] for i in keep)), dtype=np.float64)
+        offsets = np.zeros(len(keep) + 1, dtype=np.intp)
+        np.cumsum(lengths, out=offsets[1:])
+        boxes, totals = _get_bbox_reduce()(all_points, offsets, category_ids)
+    counts.update(zip(COUNT_CATEGORIES, totals.tolist()))
+    return BBoxes([labels[i] for i in keep], boxes.astype(np.int32)), counts
+
+
+def _parse_demo_json(json_path: Path) -> Dict[str, np.ndarray]:
+    """Parse a labelme JSON into flat arrays: per-shape labels/types, packed mask points, boxes, counts."""
+    shapes = _load_json_file(json_path).get("shapes", [])
+    labels = [str(shape.get("label", "unknown")) for shape in shapes]
+    point_lists = [shape.get("points", []) for shape in shapes]
+    # Whole-pixel int points: orjson serializes them natively and the payload is ~3x smaller.
+    mask_points = [np.rint(np.asarray(points, dtype=np.float64)).astype(np.int32).reshape(-1, 2) for points in point_lists]
+    offsets = np.zeros(len(mask_points) + 1, dtype=np.int64)
+    np.cumsum([len(points) for points in mask_points], out=offsets[1:])
+    boxes, counts = _polygons_to_boxes(labels, point_lists)
+    return {
+        "labels": np.array(labels, dtype=str),
+        "shape_types": np.array([str(shape.get("shape_type", "polygon")) for shape in shapes], dtype=str),
+        "points": np.concatenate(mask_points) if mask_points else np.empty((0, 2), dtype=np.int32),
+        "offsets": offsets,
+        "box_labels": np.array(boxes.labels, dtype=str),
+        "xywh": boxes.xywh,
+        "counts": np.array([counts[c] for c in COUNT_CATEGORIES], dtype=np.int64),
+    }
+
+
+# Bump whenever `_parse_demo_json` output changes (new field, dtype, rounding), so
+# `.npz` files written by an older build are not loaded after a deploy.
+_DEMO_CACHE_VERSION = 1
+
+
+def _demo_arrays(json_path: Path, json_version: Tuple[int, int]) -> Dict[str, np.ndarray]:
+    """`_parse_demo_json` with a read-through `.npz` cache in `DEMO_CACHE_DIR`, keyed by file version.
+
+    The cache survives restarts (and is shared by workers), so only the first process to see a
+    given JSON version pays for the parse. Names carry a hash of the resolved source path (two
+    demo dirs never share entries) and `_DEMO_CACHE_VERSION`. Any cache I/O problem just falls
+    back to parsing.
+    """
+    source_hash = hashlib.blake2b(str(json_path.resolve()).encode(), digest_size=6).hexdigest()
+    prefix = f"{json_path.stem}_{source_hash}_arrays"
+    cache_path = DEMO_CACHE_DIR / f"{prefix}_v{_DEMO_CACHE_VERSION}_{json_version[0]:x}_{json_version[1]:x}.npz"
+    try:
+        with np.load(cache_path) as npz:
+            return {key: npz[key] for key in npz.files}
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        logger.warning("Ignoring unreadable demo cache %s: %s", cache_path, e)
+    arrays = _parse_demo_json(json_path)
+    try:
+        DEMO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, cache_path)
+        for old in DEMO_CACHE_DIR.glob(f"{prefix}_*.npz"):
+            if old != cache_path:
+                old.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning("Could not write demo cache %s: %s", cache_path, e)
+    return arrays
+
+
+# Bump when the analyze_demo payload changes shape or is computed differently, so
+# clients holding an old ETag get the new body even though the demo files did not change.
+DEMO_PAYLOAD_VERSION = 1
+
+
+@lru_cache(maxsize=16)
+def _load_demo(
+    json_path: Path, json_version: Tuple[int, int], img_path: Path, img_version: Tuple[int, int]
+) -> Dict[str, Any]:
+    """Parse and analyze a demo case: masks, boxes, counts, image `(width, height)`, risk report, ETag.
+
+    Everything here depends only on the two files, so it is memoized per file version:
+    the `(st_mtime_ns, st_size)` tuples are only part of the cache key, so an edited
+    JSON/JPEG is re-read on the next request. Callers must not mutate the result.
+    """
+    arrays = _demo_arrays(json_path, json_version)
+    points, offsets = arrays["points"], arrays["offsets"].tolist()
+    masks = [
+        {"label": label, "points": points[start:end], "shape_type": shape_type}
+        for label, shape_type, start, end in zip(
+            arrays["labels"].tolist(), arrays["shape_types"].tolist(), offsets[:-1], offsets[1:]
+        )
+    ]
+    boxes = BBoxes(arrays["box_labels"].tolist(), arrays["xywh"])
+    counts = dict(zip(COUNT_CATEGORIES, arrays["counts"].tolist()))
+    dims = tuple(_image_size(img_path))
+    risk_report = semantic_analyzer.analyze(boxes, dims)
+    # Everything the body is built from: file versions for the masks/boxes, the analyzer
+    # output itself, and the payload format; the endpoint adds the asset URLs.
+    etag_seed = orjson.dumps(
+        [DEMO_PAYLOAD_VERSION, json_path.stem, json_version, img_version, counts, dims, risk_report],
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
+    return {
+        "masks": masks,
+        "boxes": boxes,
+        "counts": counts,
+        "dims": dims,
+        "risk_report": risk_report,
+        "etag_seed": etag_seed,
+    }
+
+
+# Demo case ids are plain file stems (e.g. IMG_1397); anything else never reaches the filesystem.
+_CASE_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def _demo_case(case_id: str) -> Dict[str, Any]:
+    """Return the (memoized) `_load_demo` result for `case_id`, raising HTTP errors."""
+    if not _CASE_ID_RE.fullmatch(case_id):
+        raise HTTPException(status_code=400, detail=f"Invalid case_id: {case_id!r}")
     demo_data_dir = DEMO_DATA_DIR
     if not demo_data_dir.exists():
         raise HTTPException(
@@ -441,68 +950,81 @@ async def analyze_demo(_request: Request, case_id: str = Form(...)) -> Dict[str,
     json_path = demo_data_dir / f"{case_id}_ortho.json"
     img_path = demo_data_dir / f"{case_id}_ortho.jpg"
 
-    if not json_path.exists():
+    json_st = _stat_or_none(json_path)
+    if json_st is None:
         raise HTTPException(status_code=404, detail=f"Demo JSON not found: {json_path.name}")
-    if not img_path.exists():
+    img_st = _stat_or_none(img_path)
+    if img_st is None:
         raise HTTPException(status_code=404, detail=f"Demo image not found: {img_path.name}")
 
     try:
-        data = json.loads(json_path.read_text(encoding="utf-8"))
+        return _load_demo(
+            json_path, (json_st.st_mtime_ns, json_st.st_size), img_path, (img_st.st_mtime_ns, img_st.st_size)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse {json_path.name}: {e}") from e
 
-    bounding_boxes: List[List[Any]] = []
-    mask_polygons: List[Dict[str, Any]] = []
-    counts = {"window": 0, "ac": 0, "door": 0, "other": 0}
 
-    for shape in data.get("shapes", []):
-        label = str(shape.get("label", "unknown"))
-        points = shape.get("points", [])
-        mask_polygons.append(
-            {
-                "label": label,
-                "points": points,
-                "shape_type": shape.get("shape_type", "polygon"),
-            }
-        )
-
-        pts = np.array(points)
-        if pts.size == 0:
-            continue
-        x_min, y_min = pts.min(axis=0)
-        x_max, y_max = pts.max(axis=0)
-        w, h = x_max - x_min, y_max - y_min
-        bounding_boxes.append([label, int(x_min), int(y_min), int(w), int(h)])
-
-        if "window" in label:
-            counts["window"] += 1
-        elif "ac" in label:
-            counts["ac"] += 1
-        elif "door" in label:
-            counts["door"] += 1
-        else:
-            counts["other"] += 1
+ANALYSIS_STREAM_BATCH = 64  # mask polygons encoded per streamed chunk
 
-    with Image.open(img_path) as img:
-        image_dims = img.size
 
-    risk_report = semantic_analyzer.analyze(bounding_boxes, image_dims)
+def _stream_analysis(head: Dict[str, Any], masks: List[Dict[str, Any]], tail: Dict[str, Any]) -> Iterator[bytes]:
+    """Yield the analyze_demo JSON object as `{**head, "masks": masks, **tail}` in chunks.
 
-    return {
-        "status": "success",
-        "risk_report": risk_report,
-        "counts": counts,
-        "masks": mask_polygons,
-        "images": {
-            "original": demo_asset_url(_demo_original_filename(case_id)),
-            "processed": demo_asset_url(f"{case_id}_ortho.jpg"),
-        },
+    The masks list is encoded `ANALYSIS_STREAM_BATCH` polygons at a time, so the first
+    bytes go out before the whole payload has been serialized.
+    """
+    yield orjson.dumps(head)[:-1] + b',"masks":['
+    for start in range(0, len(masks), ANALYSIS_STREAM_BATCH):
+        chunk = orjson.dumps(masks[start : start + ANALYSIS_STREAM_BATCH], option=orjson.OPT_SERIALIZE_NUMPY)[1:-1]
+        yield chunk if start == 0 else b"," + chunk
+    yield b"]," + orjson.dumps(tail)[1:]
+
+
+async def _analyze_demo_response(request: Request, case_id: str, cacheable: bool) -> Response:
+    """Build the streamed analyze_demo response; `cacheable` enables ETag revalidation and edge caching."""
+    # A cold case parses a multi-MB JSON; keep that off the event loop.
+    case = await asyncio.to_thread(_demo_case, case_id)
+    images = {
+        "original": demo_asset_url(_demo_original_filename(case_id)),
+        "processed": demo_asset_url(f"{case_id}_ortho.jpg"),
+    }
+    etag = f'"{hashlib.blake2b(case["etag_seed"] + orjson.dumps(images), digest_size=16).hexdigest()}"'
+    if cacheable and _etag_matches(request, etag):
+        return _not_modified(etag, API_CACHE_CONTROL)
+    bounding_boxes = case["boxes"]
+    image_dims = case["dims"]
+
+    head = {"status": "success", "risk_report": case["risk_report"], "counts": case["counts"]}
+    tail = {
+        "images": images,
         "debug": {
             "boxes_count": len(bounding_boxes),
             "image_dims": image_dims,
-            "raw_boxes": bounding_boxes,
+            "raw_boxes": bounding_boxes.rows(),
         },
     }
+    return StreamingResponse(
+        _stream_analysis(head, case["masks"], tail),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": API_CACHE_CONTROL if cacheable else "no-store"},
+    )
+
+
+@app.get("/api/analyze_demo/{case_id}")
+async def get_analyze_demo(request: Request, case_id: str) -> Response:
+    """Analyze a bundled demo case (cacheable GET: ETag/304 and edge caching)."""
+    return await _analyze_demo_response(request, case_id, cacheable=True)
+
+
+@app.post("/api/analyze_demo")
+async def analyze_demo(request: Request, case_id: str = Form(...)) -> Response:
+    """Analyze a bundled demo case and return the computed results (local-only).
+
+    Kept for form-posting clients; POST responses are not cached or revalidated,
+    use `GET /api/analyze_demo/{case_id}` for that.
+    """
+    return await _analyze_demo_response(request, case_id, cacheable=False)
 
 
 @app.get("/floor_plan.html")
@@ -530,8 +1052,45 @@ async def root() -> Response:
     )
 
 
+# Vite writes content-hashed bundles here; a rebuild gives them new names instead of
+# rewriting them in place, so their stat can be cached.
+_DIST_HASHED_DIR = "assets/"
+
+
+def _index_dist_files(root: Path) -> Dict[str, Tuple[str, Optional[os.stat_result]]]:
+    """Map every file under `root` (POSIX relative path) to its absolute path and cached stat.
+
+    Only hashed `assets/` files keep their stat; unhashed files such as `index.html` are
+    rewritten in place by a rebuild, so they map to None and are stat-ed per request.
+    """
+    files: Dict[str, Tuple[str, Optional[os.stat_result]]] = {}
+    if root.is_dir():
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                rel = Path(path).relative_to(root).as_posix()
+                files[rel] = (path, os.stat(path) if rel.startswith(_DIST_HASHED_DIR) else None)
+    return files
+
+
+# Built frontend files, indexed once at startup so static hits skip path resolution
+# (and, for hashed assets, stat calls).
+_DIST_FILES = _index_dist_files(FRONTEND_DIST_DIR)
+_DIST_STATS = {path: st for path, st in _DIST_FILES.values() if st is not None}
+
+
+def _dist_file_response(path: str, request: Request, stat_result: Optional[os.stat_result] = None) -> Response:
+    """FileResponse for a built frontend file, preferring a precompressed sibling.
+
+    `stat_result` is passed only for hashed assets; otherwise the file is stat-ed now.
+    """
+    stat_file = _DIST_STATS.get if stat_result is not None else None
+    resp = _precompressed_response(path, request.headers.get("accept-encoding", ""), stat_file=stat_file)
+    return resp if resp is not None else FileResponse(path, stat_result=stat_result)
+
+
 @app.get("/{full_path:path}")
-async def spa_fallback(full_path: str) -> Response:
+async def spa_fallback(full_path: str, request: Request) -> Response:
     """Serve frontend static files and SPA fallback to index.html.
 
     This makes React Router (or direct URL access) work when deployed behind a
@@ -540,8 +1099,12 @@ async def spa_fallback(full_path: str) -> Response:
     if full_path.startswith("api/") or full_path.startswith("demo_data/"):
         raise HTTPException(status_code=404, detail="Not found")
 
+    hit = _DIST_FILES.get(full_path)
+    if hit is not None:
+        return _dist_file_response(hit[0], request, hit[1])
+
     built_index = FRONTEND_DIST_DIR / "index.html"
-    if not built_index.exists():
+    if "index.html" not in _DIST_FILES and not built_index.exists():
         legacy = PUBLIC_DIR / full_path
         if legacy.is_file():
             return FileResponse(str(legacy))
@@ -549,6 +1112,7 @@ async def spa_fallback(full_path: str) -> Response:
 
     candidate = _safe_resolve_under(FRONTEND_DIST_DIR, full_path)
     if candidate.is_file():
-        return FileResponse(str(candidate))
-    return FileResponse(str(built_index))
+        return _dist_file_response(str(candidate), request)
+    index_path, index_stat = _DIST_FILES.get("index.html", (str(built_index), None))
+    return _dist_file_response(index_path, request, index_stat)
 
@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class BBoxes:
+    """Bounding boxes as parallel columns: `labels[i]` goes with `xywh[i] = (x, y, w, h)`."""
+
+    labels: list
+    xywh: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from the legacy list of `(label, x, y, w, h)` rows."""
+        labels = [r[0] for r in rows]
+        xywh = np.array([r[1:] for r in rows], dtype=np.int32).reshape(-1, 4)
+        return cls(labels, xywh)
+
+    @classmethod
+    def coerce(cls, boxes):
+        """Return `boxes` unchanged if already a `BBoxes`, else convert from rows."""
+        return boxes if isinstance(boxes, cls) else cls.from_rows(boxes)
+
+    def rows(self):
+        """Materialize the legacy `[label, x, y, w, h]` rows (e.g. for JSON output)."""
+        return [[label, *box] for label, box in zip(self.labels, self.xywh.tolist())]
+
+    def __len__(self):
+        return len(self.labels)
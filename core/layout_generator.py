@@ -1,4 +1,6 @@
-import ezdxf
+import numpy as np
+
+from .bboxes import BBoxes
 
 
 class LayoutGenerator:
@@ -9,10 +11,12 @@ class LayoutGenerator:
         """
         Generates a DXF file based on facade elements.
         Args:
-            bounding_boxes: List of (label, x, y, w, h)
+            bounding_boxes: BBoxes, or a list of (label, x, y, w, h)
             image_dims: (width, height)
             output_path: Path to save .dxf
         """
+        import ezdxf  # deferred: only DXF export needs it
+
         doc = ezdxf.new()
         msp = doc.modelspace()
 
@@ -27,16 +31,15 @@ class LayoutGenerator:
         depth = 12000  # 12 meters deep
 
         img_w, img_h = image_dims
+        boxes = BBoxes.coerce(bounding_boxes)
+        xs, ws = boxes.xywh[:, 0], boxes.xywh[:, 2]
 
         # Identify building bounds
-        xs = [b[1] for b in bounding_boxes]
-        xws = [b[1] + b[3] for b in bounding_boxes]
-
-        if not xs:
+        if not len(boxes):
             min_x, max_x = 0, img_w
         else:
-            min_x = min(xs)
-            max_x = max(xws)
+            min_x = int(xs.min())
+            max_x = int((xs + ws).max())
 
         width_mm = (max_x - min_x) * scale
 
@@ -56,42 +59,31 @@ class LayoutGenerator:
 
         # 3. Draw Partitions (Between windows)
         # Sort windows by X to find bays
-        windows = sorted(
-            [b for b in bounding_boxes if b[0] == "window"], key=lambda x: x[1]
-        )
+        is_window = np.array([label == "window" for label in boxes.labels], dtype=bool)
+        win = boxes.xywh[is_window][:, [0, 2]].astype(np.float64)
+        win = win[np.argsort(win[:, 0], kind="stable")]
 
         # Find unique "columns" of windows (approximate x-centers)
-        if windows:
-            current_cluster = [windows[0]]
-            for w in windows[1:]:
-                # If x-center is close to previous, group them
-                prev_xc = current_cluster[-1][1] + current_cluster[-1][3] / 2
-                curr_xc = w[1] + w[3] / 2
-
-                if abs(curr_xc - prev_xc) < (w[3]):  # If within a window width
-                    current_cluster.append(w)
-                else:
-                    # New column
-                    # Calculate partition line X (midpoint between last cluster and this one)
-                    prev_max_x = max([b[1] + b[3] for b in current_cluster])
-                    curr_min_x = w[1]
-
-                    partition_x_px = (prev_max_x + curr_min_x) / 2
-                    partition_x_mm = (partition_x_px - min_x) * scale
-
-                    # Draw partition
-                    msp.add_line(
-                        (partition_x_mm, 0),
-                        (partition_x_mm, depth / 2),
-                        dxfattribs={"layer": "WALL"},
-                    )
-
-                    current_cluster = [w]
+        if len(win):
+            win_x, win_w = win[:, 0], win[:, 1]
+            centers = win_x + win_w / 2
+            # A window joins the previous column if its x-center is within a window width
+            new_column = np.abs(np.diff(centers)) >= win_w[1:]
+            column_starts = np.concatenate(([0], np.flatnonzero(new_column) + 1))
+            column_max_x = np.maximum.reduceat(win_x + win_w, column_starts)
+
+            # Partition line X: midpoint between a column's right edge and the next column's left edge
+            partition_x_px = (column_max_x[:-1] + win_x[column_starts[1:]]) / 2
+            for partition_x_mm in ((partition_x_px - min_x) * scale).tolist():
+                # Draw partition
+                msp.add_line(
+                    (partition_x_mm, 0),
+                    (partition_x_mm, depth / 2),
+                    dxfattribs={"layer": "WALL"},
+                )
 
         # 4. Draw Windows/Doors on Facade Line (y=0)
-        for b in bounding_boxes:
-            label, x, y, w, h = b
-
+        for label, x, y, w, h in boxes.rows():
             # Map x relative to building left
             start_x_mm = (x - min_x) * scale
             width_mm_elem = w * scale
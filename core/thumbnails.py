@@ -0,0 +1,209 @@
+"""Thumbnail/viewport JPEG rendering, run inside the API's render process pool.
+
+Kept free of import-time side effects (no app, no env reads, no filesystem work):
+pool workers unpickle these functions by reference, so importing this module is
+all a worker does before rendering. Sizes and qualities are passed in by the caller.
+"""
+import fcntl
+import logging
+import math
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    from turbojpeg import TJFLAG_PROGRESSIVE, TJPF_RGB, TJSAMP_420, TurboJPEG
+except ImportError:
+    TurboJPEG = None
+
+logger = logging.getLogger(__name__)
+
+
+_turbojpeg: Any = None
+
+# EXIF orientation -> transpose, mirroring `ImageOps.exif_transpose`.
+_EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def _get_turbojpeg() -> Optional[Any]:
+    """Return a shared TurboJPEG handle, or None if PyTurboJPEG/libturbojpeg is unavailable."""
+    global _turbojpeg
+    if _turbojpeg is None:
+        _turbojpeg = False
+        if TurboJPEG is not None:
+            try:
+                _turbojpeg = TurboJPEG()
+            except Exception as e:
+                logger.warning("PyTurboJPEG installed but libturbojpeg could not be loaded: %s", e)
+    return _turbojpeg or None
+
+
+def open_rgb_scaled(
+    src: Path, max_w: int, max_h: int, *, exif_transpose: bool = False
+) -> Tuple[Image.Image, Tuple[int, int]]:
+    """Open `src` as RGB for a resize that fits within `max_w` x `max_h`.
+
+    JPEGs are decoded at the smallest IDCT scaling factor (1/2, 1/4, 1/8, ...) that
+    still covers the target box -- via libturbojpeg when available, else via
+    `Image.draft` -- so the full-res pixel buffer is never materialized. Returns the image and the full-resolution
+    (post-orientation) size so callers compute final dimensions unchanged.
+    """
+    tj = _get_turbojpeg()
+    if tj is None or src.suffix.lower() not in (".jpg", ".jpeg"):
+        with Image.open(src) as img:
+            raw_w, raw_h = img.size
+            orientation = img.getexif().get(0x0112, 1) if exif_transpose else 1
+            box_w, box_h = (max_h, max_w) if orientation in (5, 6, 7, 8) else (max_w, max_h)
+            scale = min(box_w / max(raw_w, 1), box_h / max(raw_h, 1), 1.0)
+            # Let libjpeg downscale at IDCT time (Pillow's equivalent of the turbo path below).
+            img.draft("RGB", (max(1, math.ceil(raw_w * scale)), max(1, math.ceil(raw_h * scale))))
+            if exif_transpose:
+                img = ImageOps.exif_transpose(img)
+            rgb = img.convert("RGB")
+        return rgb, ((raw_h, raw_w) if orientation in (5, 6, 7, 8) else (raw_w, raw_h))
+
+    buf = src.read_bytes()
+    w, h = tj.decode_header(buf)[:2]
+    orientation = 1
+    if exif_transpose:
+        with Image.open(src) as hdr:
+            orientation = hdr.getexif().get(0x0112, 1)
+        if orientation in (5, 6, 7, 8):
+            w, h = h, w
+
+    scale = min(max_w / max(w, 1), max_h / max(h, 1), 1.0)
+    factor = min(
+        (f for f in tj.scaling_factors if scale <= f[0] / f[1] <= 1),
+        key=lambda f: f[0] / f[1],
+        default=None,
+    )
+    img = Image.fromarray(tj.decode(buf, pixel_format=TJPF_RGB, scaling_factor=factor))
+    if orientation in _EXIF_TRANSPOSE:
+        img = img.transpose(_EXIF_TRANSPOSE[orientation])
+    return img, (w, h)
+
+
+def shrink(img: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """LANCZOS-resize `img` to `size`, box-reducing by an integer factor first.
+
+    With `reducing_gap`, Pillow first `reduce()`s (box average) by the largest
+    integer factor that keeps the image at least 3x the target, so the LANCZOS
+    kernel only runs over a fraction of the pixels on big shrinks; the result is
+    visually indistinguishable from a single LANCZOS pass.
+    """
+    resampling = getattr(Image, "Resampling", Image)
+    return img.resize(size, resampling.LANCZOS, reducing_gap=3.0)
+
+
+def save_jpeg(img: Image.Image, dst: Path, *, quality: int, progressive: bool) -> None:
+    """Encode `img` to `dst` as 4:2:0 JPEG, using libturbojpeg directly when available.
+
+    Huffman optimization is skipped: it roughly doubles encode time for a few
+    percent of bytes, and these files are cached for a week anyway.
+    """
+    tj = _get_turbojpeg()
+    if tj is None:
+        img.save(dst, format="JPEG", quality=quality, optimize=False, progressive=progressive, subsampling="4:2:0")
+        return
+    flags = TJFLAG_PROGRESSIVE if progressive else 0
+    dst.write_bytes(
+        tj.encode(np.asarray(img), quality=quality, pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420, flags=flags)
+    )
+
+
+def source_version(st: os.stat_result) -> str:
+    """Version tag of a source image for cache filenames: `<mtime_ns>-<size>` in hex.
+
+    Nanosecond mtime plus size, so two edits within the same second still differ.
+    """
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def evict_stale_versions(dst: Path, prefix: str) -> None:
+    """Delete older renders of `dst`: exactly `<prefix>_<source_version>.jpg`, other versions.
+
+    The glob alone would also match other prefixes that merely start with this one,
+    so each name is checked against the full pattern before deleting.
+    """
+    pattern = re.compile(re.escape(prefix) + r"_[0-9a-f]+-[0-9a-f]+\.jpg")
+    for old in dst.parent.glob(f"{prefix}_*.jpg"):
+        if old != dst and pattern.fullmatch(old.name):
+            old.unlink(missing_ok=True)
+
+
+def render_once(render: Callable[[Path, Path], None], src: Path, dst: Path, prefix: str) -> None:
+    """Run `render(src, dst)` unless `dst` already exists (runs inside a pool worker).
+
+    An flock on `<prefix>.lock` coalesces concurrent first hits -- across pool
+    workers and server processes -- so each version is rendered once; the output
+    is written to a temp file and renamed so the static mount never serves a
+    partial JPEG.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with open(dst.parent / f"{prefix}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if dst.exists():
+                return
+            tmp = dst.with_name(f"{dst.name}.tmp")
+            render(src, tmp)
+            os.replace(tmp, dst)
+            evict_stale_versions(dst, prefix)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def render_ortho_thumb(src: Path, dst: Path, *, max_w: int, max_h: int, quality: int) -> None:
+    """Write the downscaled thumbnail (within `max_w` x `max_h`) of ortho image `src` to `dst`."""
+    # Limit both width/height; keep aspect ratio.
+    img, (w, h) = open_rgb_scaled(src, max_w, max_h)
+
+    scale = min(max_w / max(w, 1), max_h / max(h, 1), 1.0)
+    new_w = max(1, int(w * scale))
+    new_h = max(1, int(h * scale))
+    img = shrink(img, (new_w, new_h))
+
+    save_jpeg(img, dst, quality=quality, progressive=False)
+
+
+def render_original_thumb(src: Path, dst: Path, *, width: int, height: int, quality: int) -> None:
+    """Write the center-cropped `width` x `height` thumbnail of ORIGINAL image `src` to `dst`."""
+    with Image.open(src) as img:
+        # Correct EXIF orientation (these originals are rotated in metadata).
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGB")
+
+        w, h = img.size
+        scale = max(width / max(w, 1), height / max(h, 1))
+        new_w = max(1, int(w * scale))
+        new_h = max(1, int(h * scale))
+        img = shrink(img, (new_w, new_h))
+
+        # Center crop.
+        left = max(0, (new_w - width) // 2)
+        top = max(0, (new_h - height) // 2)
+        img = img.crop((left, top, left + width, top + height))
+
+        save_jpeg(img, dst, quality=quality, progressive=False)
+
+
+def render_viewport(src: Path, dst: Path, *, max_size: int, quality: int, exif_transpose: bool) -> None:
+    """Write a viewport-sized (max edge `max_size`) copy of `src` to `dst`."""
+    img, (w, h) = open_rgb_scaled(src, max_size, max_size, exif_transpose=exif_transpose)
+    scale = min(max_size / max(w, 1), max_size / max(h, 1), 1.0)
+    new_w = max(1, int(w * scale))
+    new_h = max(1, int(h * scale))
+    img = shrink(img, (new_w, new_h))
+    save_jpeg(img, dst, quality=quality, progressive=True)
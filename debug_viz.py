@@ -1,26 +1,67 @@
 import cv2
 import os
+from functools import lru_cache
+
 import numpy as np
-from backend.core.image_processor import ImageProcessor
+from core.image_processor import ImageProcessor
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+
+
+@lru_cache(maxsize=None)
+def label_mask(label):
+    """Rasterize `label` once into an (alpha, ascent) pair; reused for every box."""
+    (tw, th), baseline = cv2.getTextSize(label, FONT, FONT_SCALE, 1)
+    mask = np.zeros((th + baseline, tw), dtype=np.uint8)
+    cv2.putText(mask, label, (0, th), FONT, FONT_SCALE, 255, 1)
+    return mask[..., None] / 255.0, th
+
+
+def stamp_label(img, label, x, y, color):
+    """Blend the cached label coverage with its baseline at (x, y), clipped to the image."""
+    alpha, th = label_mask(label)
+    top, left = y - th, x
+    y0, x0 = max(top, 0), max(left, 0)
+    y1, x1 = min(top + alpha.shape[0], img.shape[0]), min(left + alpha.shape[1], img.shape[1])
+    if y0 >= y1 or x0 >= x1:
+        return
+    a = alpha[y0 - top : y1 - top, x0 - left : x1 - left]
+    roi = img[y0:y1, x0:x1]
+    roi[:] = np.rint(roi * (1 - a) + np.asarray(color) * a)
+
+
+def draw_boxes(img, boxes):
+    """Draw all boxes with one cv2.polylines call per color, then stamp their labels."""
+    if not boxes:
+        return img
+    labels = [b[0] for b in boxes]
+    xywh = np.array([b[1:] for b in boxes], dtype=np.int32)
+    x, y, w, h = xywh.T
+    corners = np.stack([np.stack([x, y], 1), np.stack([x + w, y], 1), np.stack([x + w, y + h], 1), np.stack([x, y + h], 1)], 1)
+    is_window = np.array([label == "window" for label in labels])
+    for sel, color in ((is_window, (0, 255, 0)), (~is_window, (0, 0, 255))):
+        if sel.any():
+            cv2.polylines(img, list(corners[sel]), True, color, 2)
+    for label, (bx, by), win in zip(labels, xywh[:, :2].tolist(), is_window):
+        stamp_label(img, label, bx, by - 5, (0, 255, 0) if win else (0, 0, 255))
+    return img
+
 
 def debug_viz():
     processor = ImageProcessor()
     test_image = "backend/uploads/IMG_1397.JPG"
-    
+
     if not os.path.exists(test_image):
         print(f"Test image not found at {test_image}")
         return
 
     print(f"Processing {test_image} and drawing boxes...")
     processed_path, boxes, dims = processor.process(test_image)
-    
+
     # Load the processed image (which is 1024 wide)
     img = cv2.imread(processed_path)
-    
-    for label, x, y, w, h in boxes:
-        color = (0, 255, 0) if label == "window" else (0, 0, 255)
-        cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
-        cv2.putText(img, label, (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    draw_boxes(img, boxes)
 
     debug_output = "backend/static/debug_boxes.jpg"
     cv2.imwrite(debug_output, img)
@@ -1,13 +1,35 @@
 import cv2
 import numpy as np
 import os
-import json
+import orjson
 import argparse
+from collections import Counter
 from pathlib import Path
 
+from facade_rectification import write_jpeg
+
+
+def perspective_maps(M, size):
+    """Fixed-point (CV_16SC2) cv2.remap tables for warping with homography M into size (w, h)."""
+    return cv2.initUndistortRectifyMap(np.eye(3), None, M, np.eye(3), size, cv2.CV_16SC2)
+
+
+def line_intersections(lines_a, lines_b):
+    """Intersections of the infinite lines lines_a[i] x lines_b[i] (rows of x1, y1, x2, y2).
+
+    Returns an (N, 2) int array, or None if any pair is parallel.
+    """
+    x1, y1, x2, y2 = np.asarray(lines_a, dtype=np.float64).T
+    x3, y3, x4, y4 = np.asarray(lines_b, dtype=np.float64).T
+    denom = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
+    if not denom.all():
+        return None
+    ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / denom
+    return np.stack([x1 + ua * (x2 - x1), y1 + ua * (y2 - y1)], axis=1).astype(int)
+
 
 class FacadeOrthoExpert:
-    def __init__(self, image_path, output_dir):
+    def __init__(self, image_path, output_dir, interpolation=cv2.INTER_LANCZOS4, save_maps=False):
         self.image_path = Path(image_path)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -19,15 +41,37 @@ class FacadeOrthoExpert:
         self.points = []
         self.labels = ["TOP Edge", "BOTTOM Edge", "LEFT Edge", "RIGHT Edge"]
         self.window_name = "Expert Facade Rectifier"
+        self.interpolation = interpolation
+        self.save_maps = save_maps  # also write the remap tables as <stem>_maps.npz
 
-    def _get_line_intersection(self, line1, line2):
-        x1, y1, x2, y2 = line1
-        x3, y3, x4, y4 = line2
-        denom = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
-        if denom == 0:
-            return None
-        ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / denom
-        return int(x1 + ua * (x2 - x1)), int(y1 + ua * (y2 - y1))
+    def _warp(self, M, size, out=None, maps=None):
+        """Warp self.img with M into size (w, h).
+
+        A one-off warp uses cv2.warpPerspective, which tiles internally instead of
+        holding full-size remap tables (~6 bytes/pixel). `maps` (a perspective_maps()
+        result) is only worth passing when the same M is applied more than once.
+        `out`, if given, is a C-contiguous (h, w, 3) uint8 array the result is written into.
+        """
+        if maps is None:
+            return cv2.warpPerspective(
+                self.img,
+                M,
+                size,
+                dst=out,
+                flags=self.interpolation,
+                borderMode=cv2.BORDER_CONSTANT,
+                borderValue=(0, 0, 0),
+            )
+        map1, map2 = maps
+        return cv2.remap(
+            self.img,
+            map1,
+            map2,
+            dst=out,
+            interpolation=self.interpolation,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0),
+        )
 
     def _mouse_callback(self, event, x, y, flags, param):
         if event == cv2.EVENT_LBUTTONDOWN:
@@ -46,61 +90,139 @@ class FacadeOrthoExpert:
             "操作: 依次为 [上、下、左、右] 边缘各点 2 个点。按 'c' 执行，按 'q' 退出。"
         )
 
+        # Overlays are drawn into one reused buffer, and only when the points change.
+        display = np.empty_like(self.img)
+        drawn = None
         while True:
-            display = self.img.copy()
-            for i, pt in enumerate(self.points):
-                cv2.circle(display, pt, 5, (0, 0, 255), -1)
-                if i % 2 == 1:
-                    cv2.line(
-                        display, self.points[i - 1], self.points[i], (0, 255, 0), 2
-                    )
-
-            curr_step = len(self.points) // 2
-            msg = (
-                f"Task: {self.labels[curr_step]}"
-                if curr_step < 4
-                else "Ready! Press 'c'"
-            )
-            cv2.putText(
-                display, msg, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2
-            )
+            if self.points != drawn:
+                np.copyto(display, self.img)
+                for i, pt in enumerate(self.points):
+                    cv2.circle(display, pt, 5, (0, 0, 255), -1)
+                    if i % 2 == 1:
+                        cv2.line(
+                            display, self.points[i - 1], self.points[i], (0, 255, 0), 2
+                        )
+
+                curr_step = len(self.points) // 2
+                msg = (
+                    f"Task: {self.labels[curr_step]}"
+                    if curr_step < 4
+                    else "Ready! Press 'c'"
+                )
+                cv2.putText(
+                    display, msg, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2
+                )
+
+                cv2.imshow(self.window_name, display)
+                drawn = list(self.points)
 
-            cv2.imshow(self.window_name, display)
             key = cv2.waitKey(1) & 0xFF
             if key == ord("c") and len(self.points) == 8:
                 break
             elif key == ord("q"):
                 return
 
-        top_l, bot_l = (
-            (*self.points[0], *self.points[1]),
-            (*self.points[2], *self.points[3]),
-        )
-        lef_l, rig_l = (
-            (*self.points[4], *self.points[5]),
-            (*self.points[6], *self.points[7]),
-        )
-        tl, tr = (
-            self._get_line_intersection(top_l, lef_l),
-            self._get_line_intersection(top_l, rig_l),
+        cv2.destroyAllWindows()
+        return self._compute_and_save(self.points)
+
+    @classmethod
+    def from_points(cls, image_path, output_dir, points, interpolation=cv2.INTER_LANCZOS4, save_maps=False):
+        """Headless run: rectify with 8 edge points (2 each for TOP, BOTTOM, LEFT, RIGHT)."""
+        return cls(image_path, output_dir, interpolation, save_maps)._compute_and_save(points)
+
+    @classmethod
+    def process_batch(cls, image_paths, points_list, output_dir, interpolation=cv2.INTER_LANCZOS4, save_maps=False):
+        """Headless batch run; every image is warped into one shared, pre-allocated buffer.
+
+        Images whose corners (and so M and output size) repeat share one set of remap
+        tables, built on first use; one-off geometries go through warpPerspective.
+        Returns one from_points() result per image.
+        """
+        geometries = [cls._geometry(points) for points in points_list]
+        buf = np.empty(
+            max((w * h * 3 for *_, (w, h) in filter(None, geometries)), default=0),
+            dtype=np.uint8,
         )
-        br, bl = (
-            self._get_line_intersection(bot_l, rig_l),
-            self._get_line_intersection(bot_l, lef_l),
+        # Corners are integer intersections, so equal keys mean an identical M
+        keys = [None if g is None else (g[0].tobytes(), g[-1]) for g in geometries]
+        repeats = Counter(filter(None, keys))
+        shared_maps = {}
+        results = []
+        for image_path, geometry, key in zip(image_paths, geometries, keys):
+            if geometry is None:
+                results.append(None)
+                continue
+            _, M, _, (w, h) = geometry
+            maps = None
+            if repeats[key] > 1:
+                if key not in shared_maps:
+                    shared_maps[key] = perspective_maps(M, (w, h))
+                maps = shared_maps[key]
+            expert = cls(image_path, output_dir, interpolation, save_maps)
+            results.append(
+                expert._rectify_and_save(geometry, out=buf[: w * h * 3].reshape(h, w, 3), maps=maps)
+            )
+        return results
+
+    @classmethod
+    def apply_maps(cls, image_path, output_dir, maps_path, interpolation=cv2.INTER_LINEAR):
+        """Headless run with remap tables saved by an earlier run (save_maps=True).
+
+        For a series of shots from the same viewpoint: no points, no map construction,
+        just one cv2.remap per image. Writes <stem>_ortho.jpg and returns its path.
+        """
+        expert = cls(image_path, output_dir, interpolation)
+        with np.load(maps_path) as maps:
+            map1, map2 = maps["map1"], maps["map2"]
+        rectified = cv2.remap(
+            expert.img,
+            map1,
+            map2,
+            interpolation=interpolation,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0),
         )
+        img_out = expert.output_dir / f"{expert.image_path.stem}_ortho.jpg"
+        if not write_jpeg(img_out, rectified):
+            print(f"错误: 无法保存图像到 {img_out}")
+        print(f"成功！\n图像: {img_out}")
+        return img_out
 
-        src_pts = np.array([tl, tr, br, bl], dtype="float32")
+    def _compute_and_save(self, points):
+        """Rectify from the 8 edge points and write the ortho image + transform JSON.
 
-        def dist(p1, p2):
-            return np.sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
+        Returns (image path, transform path), or None if the edge lines do not intersect.
+        """
+        geometry = self._geometry(points)
+        if geometry is None:
+            return None
+        return self._rectify_and_save(geometry)
+
+    @staticmethod
+    def _geometry(points):
+        """(src_pts, M, M_inv, (w, h)) for the 8 edge points, or None if edges are parallel."""
+        # Rows: TOP, BOTTOM, LEFT, RIGHT edge lines as (x1, y1, x2, y2)
+        lines = np.array(points).reshape(4, 4)
+        # Corners TL, TR, BR, BL = TOP x LEFT, TOP x RIGHT, BOTTOM x RIGHT, BOTTOM x LEFT
+        corners = line_intersections(lines[[0, 0, 1, 1]], lines[[2, 3, 3, 2]])
+        if corners is None:
+            print("错误: 存在平行的边缘线，无法求出角点")
+            return None
+
+        src_pts = corners.astype("float32")
+
+        # Edge lengths: top, right, bottom, left
+        top, right, bottom, left = np.linalg.norm(
+            np.diff(corners, axis=0, append=corners[:1]), axis=1
+        )
 
         scale = 1.5
-        w_max = max(dist(tl, tr), dist(bl, br))
-        w_min = min(dist(tl, tr), dist(bl, br))
+        w_max = max(top, bottom)
+        w_min = min(top, bottom)
         aspect = w_max / w_min if w_min > 0 else 1.0
 
         w_val = w_max * scale
-        h_val = ((dist(tl, bl) + dist(tr, br)) / 2) * scale * aspect
+        h_val = ((left + right) / 2) * scale * aspect
 
         max_dim = 8000
         if w_val > max_dim or h_val > max_dim:
@@ -117,44 +239,76 @@ class FacadeOrthoExpert:
         )
 
         M = cv2.getPerspectiveTransform(src_pts, dst_pts)
-        M_inv = cv2.getPerspectiveTransform(dst_pts, src_pts)
+        M_inv = np.linalg.inv(M)
+        M_inv /= M_inv[2, 2]  # same normalization as getPerspectiveTransform
+        return src_pts, M, M_inv, (w, h)
 
-        rectified = cv2.warpPerspective(
-            self.img,
-            M,
-            (w, h),
-            flags=cv2.INTER_LANCZOS4,
-            borderMode=cv2.BORDER_CONSTANT,
-            borderValue=(0, 0, 0),
-        )
+    def _rectify_and_save(self, geometry, out=None, maps=None):
+        """Warp with a _geometry() result (into `out` if given) and write image + transform JSON."""
+        src_pts, M, M_inv, (w, h) = geometry
+        if maps is None and self.save_maps:
+            # The tables are written out anyway, so warp with them too
+            maps = perspective_maps(M, (w, h))
+        rectified = self._warp(M, (w, h), out=out, maps=maps)
 
         base_name = self.image_path.stem
         img_out = self.output_dir / f"{base_name}_ortho.jpg"
         meta_out = self.output_dir / f"{base_name}_transform.json"
 
-        success = cv2.imwrite(str(img_out), rectified)
+        success = write_jpeg(img_out, rectified)
         if not success:
             print(f"错误: 无法保存图像到 {img_out}")
 
         transform_data = {
             "image": str(self.image_path.name),
             "output_size": [w, h],
-            "matrix": M.tolist(),
-            "inverse_matrix": M_inv.tolist(),
-            "source_pts": src_pts.tolist(),
+            "matrix": M,
+            "inverse_matrix": M_inv,
+            "source_pts": src_pts,
         }
-        with open(meta_out, "w") as f:
-            json.dump(transform_data, f, indent=4)
+        meta_out.write_bytes(
+            orjson.dumps(transform_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        )
+
+        if self.save_maps:
+            # CV_16SC2 + CV_16UC1 tables: 6 bytes/pixel vs 8 for a pair of float32 maps
+            map1, map2 = maps
+            maps_out = self.output_dir / f"{base_name}_maps.npz"
+            np.savez(maps_out, map1=map1, map2=map2)
+            print(f"映射表: {maps_out}")
 
         print(f"图像尺寸: {w}x{h}")
         print(f"成功！\n图像: {img_out}\n数据: {meta_out}")
-        cv2.destroyAllWindows()
+        return img_out, meta_out
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--input", required=True, help="输入图像路径")
     parser.add_argument("-o", "--output", default="./output", help="输出目录")
+    parser.add_argument(
+        "--fast", action="store_true", help="使用双线性插值（约快 2-3 倍），默认 Lanczos"
+    )
+    parser.add_argument(
+        "--points",
+        type=int,
+        nargs=16,
+        metavar="XY",
+        help="无界面模式: 直接给出 [上、下、左、右] 边缘各 2 个点的 16 个坐标",
+    )
+    parser.add_argument(
+        "--save-maps", action="store_true", help="同时保存映射表 <名称>_maps.npz，供 --maps 复用"
+    )
+    parser.add_argument(
+        "--maps", help="无界面模式: 用已保存的映射表矫正同一视角拍摄的图像"
+    )
     args = parser.parse_args()
 
-    FacadeOrthoExpert(args.input, args.output).run()
+    interpolation = cv2.INTER_LINEAR if args.fast else cv2.INTER_LANCZOS4
+    if args.maps:
+        FacadeOrthoExpert.apply_maps(args.input, args.output, args.maps, interpolation)
+    elif args.points:
+        pts = list(zip(args.points[::2], args.points[1::2]))
+        FacadeOrthoExpert.from_points(args.input, args.output, pts, interpolation, save_maps=args.save_maps)
+    else:
+        FacadeOrthoExpert(args.input, args.output, interpolation, args.save_maps).run()
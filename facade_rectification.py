@@ -6,10 +6,118 @@
 
 import cv2
 import numpy as np
-import json
+import orjson
 import os
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    from turbojpeg import TJSAMP_420, TurboJPEG
+except ImportError:  # 可选依赖：没有 PyTurboJPEG 时退回 cv2.imwrite
+    TurboJPEG = None
+
+_turbojpeg = None
+
+
+def write_jpeg(path, image, quality=95):
+    """保存 BGR 图像为 JPEG：优先用 libjpeg-turbo (PyTurboJPEG) 编码，不可用时退回 cv2.imwrite"""
+    global _turbojpeg
+    if _turbojpeg is None:
+        _turbojpeg = False
+        if TurboJPEG is not None:
+            try:
+                _turbojpeg = TurboJPEG()
+            except Exception as e:
+                print(f"PyTurboJPEG 已安装但无法加载 libturbojpeg，改用 OpenCV: {e}")
+    if not _turbojpeg:
+        return cv2.imwrite(str(path), image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    try:
+        Path(path).write_bytes(_turbojpeg.encode(image, quality=quality, jpeg_subsample=TJSAMP_420))
+    except OSError:
+        return False
+    return True
+
+
+try:  # 可选：OpenCV 带 CUDA 编译且有可用显卡时，透视变换放到 GPU 上做
+    _CUDA = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    _CUDA = False
+
+
+def warp_perspective(image, M, size, border_value=(200, 200, 200)):
+    """cv2.warpPerspective（双线性插值、常数边界）；有 CUDA 设备时用 cv2.cuda.warpPerspective"""
+    if _CUDA:
+        src = cv2.cuda_GpuMat()
+        src.upload(image)
+        dst = cv2.cuda.warpPerspective(
+            src, M, size, flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT, borderValue=border_value
+        )
+        return dst.download()
+    return cv2.warpPerspective(
+        image, M, size, flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT, borderValue=border_value
+    )
+
+
+def _order_points(pts):
+    """4个点排序为 [左上, 右上, 右下, 左下]：y 最小的两个点为上边，再各自按 x 排序"""
+    pts = np.asarray(pts, dtype=np.float32).reshape(4, 2)
+    by_y = pts[np.argsort(pts[:, 1], kind="stable")]
+    top = by_y[:2][np.argsort(by_y[:2, 0], kind="stable")]
+    bottom = by_y[2:][np.argsort(by_y[2:, 0], kind="stable")]
+    return np.stack([top[0], top[1], bottom[1], bottom[0]])
+
+
+def _make_stamp(radius, circles):
+    """预先画好的标注点图章：(颜色图, 遮罩)，circles 为 [(半径, 颜色, 线宽), ...]"""
+    size = 2 * radius + 1
+    stamp = np.zeros((size, size, 3), dtype=np.uint8)
+    mask = np.zeros((size, size), dtype=np.uint8)
+    for r, color, thickness in circles:
+        cv2.circle(stamp, (radius, radius), r, color, thickness)
+        cv2.circle(mask, (radius, radius), r, 255, thickness)
+    return stamp, mask.astype(bool)
+
+
+# update_display: 黄色实心点 + 红色外圈；preview: 仅黄色实心点
+_POINT_STAMP = _make_stamp(11, [(8, (0, 255, 255), -1), (10, (0, 0, 255), 2)])
+_PREVIEW_STAMP = _make_stamp(8, [(8, (0, 255, 255), -1)])
+
+
+def _paste_stamp(image, stamp, x, y):
+    """把图章以 (x, y) 为中心贴到图像上（按遮罩覆盖，超出边界部分裁掉）"""
+    colors, mask = stamp
+    r = mask.shape[0] // 2
+    h, w = image.shape[:2]
+    x0, y0 = max(x - r, 0), max(y - r, 0)
+    x1, y1 = min(x + r + 1, w), min(y + r + 1, h)
+    if x0 >= x1 or y0 >= y1:
+        return
+    sy, sx = slice(y0 - y + r, y1 - y + r), slice(x0 - x + r, x1 - x + r)
+    m = mask[sy, sx]
+    image[y0:y1, x0:x1][m] = colors[sy, sx][m]
+
+
+def polygon_area(points):
+    """鞋带公式计算多边形面积（顶点按顺序排列，N x 2）"""
+    points = np.asarray(points, dtype=np.float64)
+    x, y = points[:, 0], points[:, 1]
+    nxt = np.r_[1:len(points), 0]
+    return 0.5 * np.abs((x * y[nxt] - y * x[nxt]).sum())
+
+
+def _axis_aligned_crop(src_points, width, height):
+    """[左上, 右上, 右下, 左下] 构成图像内的整数轴对齐矩形时返回 (x0, y0, x1, y1)，否则返回 None"""
+    pts = np.asarray(src_points, dtype=np.float64)
+    if not np.allclose(pts, np.rint(pts), atol=1e-6):
+        return None
+    (x0, y0), (x1, y1) = pts[0].astype(int), pts[2].astype(int)
+    aligned = (pts[1] == (x1, y0)).all() and (pts[3] == (x0, y1)).all()
+    if not aligned or not (0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height):
+        return None
+    return x0, y0, x1, y1
+
 
 class FacadeRectifier:
     def __init__(self, image_path, output_dir='./output'):
@@ -30,7 +138,13 @@ class FacadeRectifier:
             raise ValueError(f"无法读取图像: {image_path}")
 
         self.height, self.width = self.original.shape[:2]
-        self.points = []  # 存储标注的点
+        # 标注点：预分配的 (容量, 2) 数组 + 计数，self.points 返回其前 N 行的视图
+        self._pts = np.empty((32, 2), dtype=np.int32)
+        self._n = 0
+        self._display = np.empty_like(self.original)
+        self._base = np.empty_like(self.original)
+        self._drawn = None  # _base 上已画好的点（tuple 列表）
+        self._dirty = []    # _display 上叠加在 _base 之外的矩形区域
 
         print(f"图像尺寸: {self.width} x {self.height}")
         print(f"\n操作说明:")
@@ -41,16 +155,35 @@ class FacadeRectifier:
         print("  - 'c' 键: 完成标注，执行矫正")
         print("  - 'q' 键: 退出")
 
+    @property
+    def points(self):
+        """已标注的点，(N, 2) int32 数组（视图，不拷贝）"""
+        return self._pts[:self._n]
+
+    @points.setter
+    def points(self, value):
+        value = np.asarray(value, dtype=np.int32).reshape(-1, 2)
+        if len(value) > len(self._pts):
+            self._pts = np.empty((2 * len(value), 2), dtype=np.int32)
+        self._pts[:len(value)] = value
+        self._n = len(value)
+
     def on_mouse(self, event, x, y, flags, param):
         """鼠标回调函数"""
         if event == cv2.EVENT_LBUTTONDOWN:
-            self.points.append([x, y])
-            print(f"添加点 {len(self.points)}: ({x}, {y})")
+            if self._n == len(self._pts):
+                self._pts = np.concatenate([self._pts, np.empty_like(self._pts)])
+            self._pts[self._n] = (x, y)
+            self._n += 1
+            print(f"添加点 {self._n}: ({x}, {y})")
 
         elif event == cv2.EVENT_RBUTTONDOWN:
-            if self.points:
-                removed = self.points.pop()
-                print(f"删除点: {removed}")
+            if self._n:
+                self._n -= 1
+                print(f"删除点: {self._pts[self._n].tolist()}")
+
+        else:
+            return  # 鼠标移动等事件不改变标注，无需重绘
 
         # 更新显示
         self.update_display()
@@ -65,27 +198,15 @@ class FacadeRectifier:
             # 创建遮罩
             mask = np.zeros((self.height, self.width), dtype=np.uint8)
 
-            # 从标注点提取四边形
-            pts = np.array(self.points, dtype=np.int32)
-
-            if len(self.points) == 3:
-                # 3个点临时构成三角形
-                pts = pts.reshape((-1, 1, 2))
-                cv2.fillPoly(mask, [pts], 255)
-            elif len(self.points) >= 4:
-                # 使用凸包
-                from scipy.spatial import ConvexHull
-                hull = ConvexHull(self.points)
-                hull_pts = self.points[hull.vertices].reshape((-1, 1, 2))
-                cv2.fillPoly(mask, [hull_pts], 255)
+            # 标注点的凸包（3个点即三角形），按凸多边形填充
+            cv2.fillConvexPoly(mask, cv2.convexHull(self.points), 255)
 
-            # 创建预览图像
-            preview = self.original.copy()
-            preview[mask == 0] = 0  # 未标注区域设为黑色
+            # 创建预览图像：未标注区域设为黑色
+            preview = cv2.bitwise_and(self.original, self.original, mask=mask)
 
             # 在预览图上叠加原始标注点
-            for i, point in enumerate(self.points):
-                cv2.circle(preview, tuple(point), 8, (0, 255, 255), -1)
+            for i, point in enumerate(self.points.tolist()):
+                _paste_stamp(preview, _PREVIEW_STAMP, *point)
                 cv2.putText(preview, str(i+1), (point[0]+12, point[1]),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
 
@@ -102,32 +223,61 @@ class FacadeRectifier:
             print(f"预览失败: {e}")
             self.update_display()
 
+    def _draw_point(self, image, pts, i):
+        """在 image 上画第 i 个点：与上一点的连线、点图章和序号"""
+        if i:
+            cv2.line(image, pts[i-1], pts[i], (0, 255, 0), 2)
+        _paste_stamp(image, _POINT_STAMP, *pts[i])
+        cv2.putText(image, str(i+1), (pts[i][0]+12, pts[i][1]),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+
     def update_display(self):
         """更新显示窗口，包含标注点和连接线"""
-        display = self.original.copy()
-
-        # 绘制标注点
-        for i, point in enumerate(self.points):
-            cv2.circle(display, tuple(point), 8, (0, 255, 255), -1)
-            cv2.circle(display, tuple(point), 10, (0, 0, 255), 2)
-            cv2.putText(display, str(i+1), (point[0]+12, point[1]),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        # 两层缓冲：_base = 原图 + 各点及点间连线；_display = _base + 闭合边 + 提示文字。
+        # 点集未变时直接显示；只追加了一个点时只在 _base/_display 上补画这个点，
+        # 并按 _dirty 记录的矩形从 _base 恢复上次的闭合边和文字，不再整幅重绘。
+        pts = [tuple(p) for p in self.points.tolist()]
+        display, base = self._display, self._base
+        if pts == self._drawn:
+            cv2.imshow('Annotation', display)
+            return
 
-        # 绘制连接线（按顺序连接点）
-        if len(self.points) >= 2:
-            pts = np.array(self.points, np.int32)
-            pts = pts.reshape((-1, 1, 2))
-            cv2.polylines(display, [pts], True, (0, 255, 0), 2)
+        if self._drawn is not None and pts[:-1] == self._drawn:
+            for x0, y0, x1, y1 in self._dirty:
+                display[y0:y1, x0:x1] = base[y0:y1, x0:x1]
+            self._draw_point(base, pts, len(pts) - 1)
+            self._draw_point(display, pts, len(pts) - 1)
+        else:
+            np.copyto(base, self.original)
+            for i in range(len(pts)):
+                self._draw_point(base, pts, i)
+            np.copyto(display, base)
+
+        self._dirty = []
+        # 闭合边（最后一点连回第一点）
+        if len(pts) >= 2:
+            cv2.line(display, pts[-1], pts[0], (0, 255, 0), 2)
+            (xa, ya), (xb, yb) = pts[-1], pts[0]
+            self._dirty.append(self._clip_rect(min(xa, xb) - 2, min(ya, yb) - 2,
+                                               max(xa, xb) + 3, max(ya, yb) + 3))
 
         # 显示提示信息
-        info = f"已标注: {len(self.points)} 个点"
+        info = f"已标注: {len(pts)} 个点"
         cv2.putText(display, info, (20, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         cv2.putText(display, info, (20, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 1)
+        (tw, th), baseline = cv2.getTextSize(info, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+        self._dirty.append(self._clip_rect(18, 28 - th, 22 + tw, 32 + baseline))
 
+        self._drawn = pts
         cv2.imshow('Annotation', display)
 
+    def _clip_rect(self, x0, y0, x1, y1):
+        """把矩形 (x0, y0, x1, y1) 裁剪到图像范围内"""
+        return (min(max(x0, 0), self.width), min(max(y0, 0), self.height),
+                min(max(x1, 0), self.width), min(max(y1, 0), self.height))
+
     def fit_rectangle(self):
         """
         将标注点拟合为矩形
@@ -140,7 +290,7 @@ class FacadeRectifier:
         if len(self.points) < 3:
             raise ValueError("至少需要标注3个点")
 
-        pts = np.array(self.points, dtype=np.float32)
+        pts = self.points.astype(np.float32)
 
         # 如果正好4个点，直接使用
         if len(self.points) == 4:
@@ -152,8 +302,7 @@ class FacadeRectifier:
 
         # 计算矩形尺寸
         # 计算上下边长度的平均值（作为宽度）
-        top_width = np.linalg.norm(src_points[1] - src_points[0])
-        bottom_width = np.linalg.norm(src_points[3] - src_points[2])
+        top_width, bottom_width = np.linalg.norm(src_points[[1, 3]] - src_points[[0, 2]], axis=1)
         target_width = int(max(top_width, bottom_width))
 
         # 保持图像高度
@@ -179,41 +328,12 @@ class FacadeRectifier:
         Returns:
             排序后的4个点: [左上, 右上, 右下, 左下]
         """
-        # 转换为numpy数组
-        pts = np.array(pts, dtype=np.float32)
-
-        # 计算中心点
-        center_x = np.mean(pts[:, 0])
-        center_y = np.mean(pts[:, 1])
-
-        # 根据相对于中心点的位置分类
-        # 左上：x < center_x 且 y < center_y
-        # 右上：x > center_x 且 y < center_y
-        # 右下：x > center_x 且 y > center_y
-        # 左下：x < center_x 且 y > center_y
-
-        top_left = None
-        top_right = None
-        bottom_right = None
-        bottom_left = None
-
-        for pt in pts:
-            if pt[0] < center_x and pt[1] < center_y:
-                top_left = pt
-            elif pt[0] >= center_x and pt[1] < center_y:
-                top_right = pt
-            elif pt[0] >= center_x and pt[1] >= center_y:
-                bottom_right = pt
-            else:  # pt[0] < center_x and pt[1] >= center_y
-                bottom_left = pt
-
-        # 返回排序后的四个点 [左上, 右上, 右下, 左下]
-        return np.array([top_left, top_right, bottom_right, bottom_left], dtype=np.float32)
+        return _order_points(pts)
 
     def extract_corners_from_points(self, pts):
         """
         从任意数量的标注点中提取建筑物角点
-        计算凸包，然后找到最接近矩形的4个角点
+        取对角线方向的4个极值点；若有重复则计算凸包推断角点
 
         Args:
             pts: 标注点 (N x 2)
@@ -221,9 +341,6 @@ class FacadeRectifier:
         Returns:
             4个角点，按顺序排列: 左上、右上、右下、左下
         """
-        from scipy.spatial import ConvexHull
-        import itertools
-
         # 转为浮点数组
         pts = np.array(pts, dtype=np.float64)
 
@@ -231,9 +348,19 @@ class FacadeRectifier:
         if len(pts) == 4:
             return self.order_points(pts)
 
-        # 计算凸包
-        hull = ConvexHull(pts)
-        hull_points = pts[hull.vertices]
+        # 沿两条对角线方向取极值点: x+y 最小/最大为左上/右下，x-y 最大/最小为右上/左下
+        s = pts[:, 0] + pts[:, 1]
+        d = pts[:, 0] - pts[:, 1]
+        corner_idx = [s.argmin(), d.argmax(), s.argmax(), d.argmin()]
+        if len(set(corner_idx)) == 4:
+            return pts[corner_idx].astype(np.float32)
+
+        # 极值点有重复（如只有3个点），退回凸包推断
+        # 计算凸包（cv2.convexHull，与预览遮罩相同；点数很少，无需加载 SciPy/Qhull）
+        hull = cv2.convexHull(pts.astype(np.float32), returnPoints=False).ravel()
+        if len(hull) < 3:
+            raise ValueError("标注点共线，无法计算凸包")
+        hull_points = pts[hull]
 
         # 如果凸包只有3个点，需要推断第4个点
         if len(hull_points) == 3:
@@ -361,7 +488,7 @@ class FacadeRectifier:
 
         # 保存调试图像
         debug_path = self.output_dir / f"{self.image_path.stem}_debug.jpg"
-        cv2.imwrite(str(debug_path), debug_image)
+        write_jpeg(debug_path, debug_image)
         print(f"\n调试图像已保存: {debug_path}")
         print("请检查调试图像中的角点标注是否正确对应:")
         print("  红色=左上, 绿色=右上, 蓝色=右下, 黄色=左下")
@@ -376,11 +503,6 @@ class FacadeRectifier:
         # 检查源点是否有效（不应该有重复或共线）
         src_np = np.array(src_points)
         # 计算四边形的面积
-        def polygon_area(points):
-            x = points[:, 0]
-            y = points[:, 1]
-            return 0.5 * np.abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1)))
-
         area = polygon_area(src_np)
         print(f"源四边形面积: {area:.2f}")
 
@@ -390,21 +512,29 @@ class FacadeRectifier:
 
         # 计算透视变换矩阵
         M = cv2.getPerspectiveTransform(src_points, dst_points)
-        M_inv = cv2.getPerspectiveTransform(dst_points, src_points)
-
-        # 执行透视变换
-        rectified = cv2.warpPerspective(
-            self.original, M, (target_width, target_height),
-            flags=cv2.INTER_LINEAR,
-            borderMode=cv2.BORDER_CONSTANT,
-            borderValue=(200, 200, 200)  # 灰色背景
-        )
+        M_inv = np.linalg.inv(M)
+        M_inv /= M_inv[2, 2]  # same normalization as getPerspectiveTransform
+
+        # 执行透视变换；源四边形是图像内的轴对齐矩形时，变换退化为裁剪 + 缩放
+        crop = _axis_aligned_crop(src_points, self.width, self.height)
+        if crop is not None:
+            x0, y0, x1, y1 = crop
+            rectified = cv2.resize(
+                self.original[y0:y1, x0:x1], (target_width, target_height),
+                interpolation=cv2.INTER_LINEAR
+            )
+        else:
+            rectified = warp_perspective(
+                self.original, M, (target_width, target_height),
+                border_value=(200, 200, 200)  # 灰色背景
+            )
 
         # 检查结果是否大部分是灰色
-        gray_rect = cv2.cvtColor(rectified, cv2.COLOR_BGR2GRAY)
-        gray_pixels = np.sum((gray_rect > 100) & (gray_rect < 150))
-        total_pixels = gray_rect.shape[0] * gray_rect.shape[1]
-        gray_ratio = gray_pixels / total_pixels
+        # 即填充背景色 (200, 200, 200) 的比例：在 1/8 缩略图上直接对 BGR 做 inRange，无需灰度转换
+        h, w = rectified.shape[:2]
+        thumb = cv2.resize(rectified, (max(1, w // 8), max(1, h // 8)), interpolation=cv2.INTER_AREA)
+        background = cv2.inRange(thumb, (195, 195, 195), (205, 205, 205))
+        gray_ratio = cv2.countNonZero(background) / background.size
 
         if gray_ratio > 0.5:
             print(f"\n警告: 结果图像中 {gray_ratio*100:.1f}% 是灰色！")
@@ -417,7 +547,7 @@ class FacadeRectifier:
         # 保存结果
         base_name = self.image_path.stem
         output_path = self.output_dir / f"{base_name}_rectified.jpg"
-        cv2.imwrite(str(output_path), rectified, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        write_jpeg(output_path, rectified, quality=95)
         print(f"矫正图像已保存: {output_path}")
 
         # 保存原始标注点和变换矩阵
@@ -427,14 +557,13 @@ class FacadeRectifier:
             "rectified_image": str(output_path),
             "original_size": {"width": self.width, "height": self.height},
             "rectified_size": {"width": target_width, "height": target_height},
-            "source_points": src_points.tolist(),
-            "destination_points": dst_points.tolist(),
-            "transform_matrix": M.tolist(),
-            "inverse_matrix": M_inv.tolist()
+            "source_points": src_points,
+            "destination_points": dst_points,
+            "transform_matrix": M,
+            "inverse_matrix": M_inv
         }
 
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(transform_data, f, indent=2, ensure_ascii=False)
+        meta_path.write_bytes(orjson.dumps(transform_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
         print(f"变换矩阵已保存: {meta_path}")
 
         # 显示结果
@@ -480,6 +609,18 @@ class FacadeRectifier:
         cv2.destroyAllWindows()
 
 
+@lru_cache(maxsize=32)
+def _load_inverse_matrix(transform_json_path, mtime_ns):
+    """读取并缓存逆变换矩阵（按文件修改时间失效），返回 9 个 float 的元组"""
+    with open(transform_json_path, 'rb') as f:
+        data = orjson.loads(f.read())
+    return tuple(float(v) for v in np.asarray(data['inverse_matrix'], dtype=np.float64).ravel())
+
+
+def _inverse_matrix(transform_json_path):
+    return _load_inverse_matrix(str(transform_json_path), os.stat(transform_json_path).st_mtime_ns)
+
+
 def map_annotation_to_original(annotation_x, annotation_y, transform_json_path):
     """
     将矫正图像上的标注坐标映射回原始图像
@@ -491,19 +632,29 @@ def map_annotation_to_original(annotation_x, annotation_y, transform_json_path):
     Returns:
         (original_x, original_y): 原始图像上的坐标
     """
-    with open(transform_json_path, 'r') as f:
-        data = json.load(f)
+    a, b, c, d, e, f, g, h, i = _inverse_matrix(transform_json_path)
 
-    M_inv = np.array(data['inverse_matrix'], dtype=np.float32)
+    # 齐次坐标应用逆变换并归一化
+    w = g * annotation_x + h * annotation_y + i
+    return (a * annotation_x + b * annotation_y + c) / w, (d * annotation_x + e * annotation_y + f) / w
 
-    # 构建齐次坐标
-    point = np.array([[annotation_x], [annotation_y], [1]], dtype=np.float32)
 
-    # 应用逆变换
-    transformed = M_inv @ point
-    transformed = transformed / transformed[2, 0]  # 归一化
+def map_annotations_to_original(xs, ys, transform_json_path):
+    """
+    批量版 map_annotation_to_original：一次映射多个坐标
+
+    Args:
+        xs, ys: 矫正图像上的坐标数组（长度相同）
+        transform_json_path: 变换矩阵JSON文件路径
 
-    return float(transformed[0, 0]), float(transformed[1, 0])
+    Returns:
+        (original_xs, original_ys): 原始图像上的坐标数组
+    """
+    a, b, c, d, e, f, g, h, i = _inverse_matrix(transform_json_path)
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    w = g * xs + h * ys + i
+    return (a * xs + b * ys + c) / w, (d * xs + e * ys + f) / w
 
 
 def main():
@@ -9,9 +9,8 @@ export async function fetchCases(signal?: AbortSignal): Promise<BuildingCase[]>
 }
 
 export async function analyzeDemo(caseId: string, signal?: AbortSignal): Promise<AnalyzeDemoResponse> {
-  const form = new FormData();
-  form.append("case_id", caseId);
-  const res = await fetch("/api/analyze_demo", { method: "POST", body: form, signal });
+  // GET so the browser/CDN can cache the result and revalidate it by ETag.
+  const res = await fetch(`/api/analyze_demo/${encodeURIComponent(caseId)}`, { signal });
   const payload = (await res.json().catch(() => null)) as unknown;
   if (!res.ok) {
     const detail =
@@ -1,8 +1,41 @@
 import react from "@vitejs/plugin-react";
-import { defineConfig } from "vite";
+import { readdirSync, readFileSync, statSync, writeFileSync } from "node:fs";
+import { join, resolve } from "node:path";
+import { brotliCompressSync, constants, gzipSync } from "node:zlib";
+import { defineConfig, type Plugin } from "vite";
+
+// Write `.br` / `.gz` siblings for text assets so the FastAPI server can serve them
+// directly with Content-Encoding instead of compressing per request.
+function precompress(): Plugin {
+  const compressible = /\.(html|js|mjs|css|json|svg|txt|map)$/;
+  let outDir = "dist";
+  return {
+    name: "precompress",
+    apply: "build",
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir);
+    },
+    closeBundle() {
+      const walk = (dir: string) => {
+        for (const name of readdirSync(dir)) {
+          const file = join(dir, name);
+          if (statSync(file).isDirectory()) {
+            walk(file);
+          } else if (compressible.test(name)) {
+            const data = readFileSync(file);
+            if (data.length < 1024) continue;
+            writeFileSync(`${file}.br`, brotliCompressSync(data, { params: { [constants.BROTLI_PARAM_QUALITY]: 11 } }));
+            writeFileSync(`${file}.gz`, gzipSync(data, { level: 9 }));
+          }
+        }
+      };
+      walk(outDir);
+    }
+  };
+}
 
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), precompress()],
   server: {
     host: true,
     port: 5173,
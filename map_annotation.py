@@ -4,28 +4,35 @@
 支持点、矩形框等常见标注类型
 """
 
-import json
+import orjson
 import argparse
 from pathlib import Path
 import numpy as np
 from typing import Union, List, Tuple
 
 
+# 点数少于此值时，拷贝到显存的开销大于 GPU 矩阵乘法省下的时间，仍用 NumPy
+GPU_MIN_POINTS = 10000
+
+
 class AnnotationMapper:
-    def __init__(self, transform_json_path):
+    def __init__(self, transform_json_path, device=None):
         """
         初始化标注映射器
 
         Args:
             transform_json_path: 变换矩阵JSON文件路径
+            device: 'cuda' 时大批量点用 torch 在 GPU 上映射（需安装 torch 且有可用显卡，否则退回 NumPy）
         """
         self.transform_path = Path(transform_json_path)
 
-        with open(self.transform_path, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
+        self.data = orjson.loads(self.transform_path.read_bytes())
 
         self.M_inv = np.array(self.data['inverse_matrix'], dtype=np.float32)
         self.M = np.array(self.data['transform_matrix'], dtype=np.float32)
+        # 行向量形式 [x, y, 1] @ M_inv.T：缓存转置后的连续副本，批量映射时直接使用
+        self._M_inv_T = np.ascontiguousarray(self.M_inv.T)
+        self._M_inv_T_gpu = self._to_gpu(self._M_inv_T) if device == 'cuda' else None
 
         self.rectified_width = self.data['rectified_size']['width']
         self.rectified_height = self.data['rectified_size']['height']
@@ -43,10 +50,99 @@ class AnnotationMapper:
         Returns:
             (original_x, original_y): 原始图像上的坐标
         """
-        point = np.array([[x], [y], [1]], dtype=np.float32)
-        transformed = self.M_inv @ point
-        transformed = transformed / transformed[2, 0]
-        return float(transformed[0, 0]), float(transformed[1, 0])
+        px, py, pw = np.dot(np.array((x, y, 1), dtype=np.float32), self._M_inv_T)
+        return float(px / pw), float(py / pw)
+
+    def map_points(self, xy: np.ndarray) -> np.ndarray:
+        """
+        批量将点从矫正图像映射到原始图像
+
+        Args:
+            xy: (N, 2) 矫正图像上的坐标数组
+
+        Returns:
+            (N, 2) float32 数组，原始图像上的坐标
+        """
+        xy = np.asarray(xy, dtype=np.float32).reshape(-1, 2)
+        if self._M_inv_T_gpu is not None and len(xy) >= GPU_MIN_POINTS:
+            return self._map_points_gpu(xy)
+        homo = np.empty((len(xy), 3), dtype=np.float32)
+        homo[:, :2] = xy
+        homo[:, 2] = 1
+        out = homo @ self._M_inv_T
+        return out[:, :2] / out[:, 2:3]
+
+    @staticmethod
+    def _to_gpu(matrix):
+        """把矩阵放到 CUDA 设备上；没有 torch 或没有可用显卡时返回 None"""
+        try:
+            import torch
+        except ImportError:
+            print("警告: 未安装 torch，使用 CPU (NumPy) 映射")
+            return None
+        if not torch.cuda.is_available():
+            print("警告: 没有可用的 CUDA 设备，使用 CPU (NumPy) 映射")
+            return None
+        return torch.from_numpy(matrix).cuda()
+
+    def _map_points_gpu(self, xy: np.ndarray) -> np.ndarray:
+        """map_points 的 GPU 版本：一次拷入显存，一次矩阵乘法，再拷回"""
+        import torch
+
+        pts = torch.from_numpy(xy).cuda()
+        homo = torch.cat([pts, torch.ones(len(pts), 1, device=pts.device)], dim=1)
+        out = homo @ self._M_inv_T_gpu
+        return (out[:, :2] / out[:, 2:3]).cpu().numpy()
+
+    @staticmethod
+    def _as_points(mapped: np.ndarray) -> List[Tuple[float, float]]:
+        """(N, 2) 数组 -> [(x, y), ...]"""
+        return list(map(tuple, mapped.tolist()))
+
+    # 每种形状拆成两步：_*_job 给出需要映射的顶点 (K, 2) 和一个组装函数，
+    # 组装函数接收这些顶点映射后的 (K, 2) 结果，返回该形状的输出字典。
+    # 单个形状的 map_* 直接映射自己的顶点；map_annotation_file 则把所有标注的顶点
+    # 拼成一个数组，只做一次 map_points。
+
+    def _rectangle_job(self, x1, y1, x2, y2):
+        left, right = min(x1, x2), max(x1, x2)
+        top, bottom = min(y1, y2), max(y1, y2)
+        # 左上、右上、右下、左下
+        vertices = np.array([[left, top], [right, top], [right, bottom], [left, bottom]])
+
+        def build(mapped):
+            return {
+                'type': 'quadrilateral',
+                'points': self._as_points(mapped),
+                'original': [x1, y1, x2, y2]
+            }
+        return vertices, build
+
+    def _circle_job(self, center_x, center_y, radius, num_points=16):
+        angles = np.linspace(0, 2 * np.pi, num_points, endpoint=False)
+        # 第0行是圆心，其余为圆周采样点
+        vertices = np.empty((num_points + 1, 2))
+        vertices[0] = center_x, center_y
+        vertices[1:, 0] = center_x + radius * np.cos(angles)
+        vertices[1:, 1] = center_y + radius * np.sin(angles)
+
+        def build(mapped):
+            return {
+                'type': 'ellipse',
+                'center': tuple(mapped[0].tolist()),
+                'boundary_points': self._as_points(mapped[1:]),
+                'original': {'center': [center_x, center_y], 'radius': radius}
+            }
+        return vertices, build
+
+    def _polygon_job(self, points):
+        def build(mapped):
+            return {
+                'type': 'polygon',
+                'points': self._as_points(mapped),
+                'original': points
+            }
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2), build
 
     def map_rectangle(self, x1: float, y1: float, x2: float, y2: float,
                       num_edge_points: int = 5) -> dict:
@@ -61,23 +157,8 @@ class AnnotationMapper:
         Returns:
             包含4个角点的四边形坐标
         """
-        # 获取4个角点
-        tl = np.array([min(x1, x2), min(y1, y2)])
-        tr = np.array([max(x1, x2), min(y1, y2)])
-        br = np.array([max(x1, x2), max(y1, y2)])
-        bl = np.array([min(x1, x2), max(y1, y2)])
-
-        # 映射4个角点
-        tl_mapped = self.map_point(*tl)
-        tr_mapped = self.map_point(*tr)
-        br_mapped = self.map_point(*br)
-        bl_mapped = self.map_point(*bl)
-
-        return {
-            'type': 'quadrilateral',
-            'points': [tl_mapped, tr_mapped, br_mapped, bl_mapped],
-            'original': [x1, y1, x2, y2]
-        }
+        vertices, build = self._rectangle_job(x1, y1, x2, y2)
+        return build(self.map_points(vertices))
 
     def map_circle(self, center_x: float, center_y: float, radius: float,
                    num_points: int = 16) -> dict:
@@ -93,23 +174,8 @@ class AnnotationMapper:
         Returns:
             椭圆的近似参数（多个点）
         """
-        points = []
-        angles = np.linspace(0, 2 * np.pi, num_points, endpoint=False)
-
-        for angle in angles:
-            x = center_x + radius * np.cos(angle)
-            y = center_y + radius * np.sin(angle)
-            points.append(self.map_point(x, y))
-
-        # 计算中心点
-        center_mapped = self.map_point(center_x, center_y)
-
-        return {
-            'type': 'ellipse',
-            'center': center_mapped,
-            'boundary_points': points,
-            'original': {'center': [center_x, center_y], 'radius': radius}
-        }
+        vertices, build = self._circle_job(center_x, center_y, radius, num_points)
+        return build(self.map_points(vertices))
 
     def map_polygon(self, points: List[Tuple[float, float]]) -> dict:
         """
@@ -121,13 +187,8 @@ class AnnotationMapper:
         Returns:
             映射后的多边形顶点
         """
-        mapped_points = [self.map_point(x, y) for x, y in points]
-
-        return {
-            'type': 'polygon',
-            'points': mapped_points,
-            'original': points
-        }
+        vertices, build = self._polygon_job(points)
+        return build(self.map_points(vertices))
 
     def map_annotation_file(self, annotation_path: str, output_path: str):
         """
@@ -147,54 +208,55 @@ class AnnotationMapper:
             annotation_path: 标注文件路径
             output_path: 输出文件路径
         """
-        with open(annotation_path, 'r', encoding='utf-8') as f:
-            annotations = json.load(f)
-
-        mapped_annotations = []
+        annotations = orjson.loads(Path(annotation_path).read_bytes())
 
+        # 第一遍：收集每个标注的顶点和组装函数
+        jobs = []
         for ann in annotations.get('annotations', []):
             ann_type = ann.get('type')
 
             if ann_type == 'point':
-                mapped = {
-                    **ann,
-                    'x', self.map_point(ann['x'], ann['y']),
-                    'mapped': True
-                }
+                vertices = np.array([[ann['x'], ann['y']]], dtype=np.float64)
+
+                def build(mapped, ann=ann):
+                    mx, my = mapped[0].tolist()
+                    return {**ann, 'x': mx, 'y': my, 'mapped': True}
 
-            elif ann_type == 'rectangle':
-                mapped_rect = self.map_rectangle(
+                jobs.append((vertices, build))
+                continue
+
+            if ann_type == 'rectangle':
+                vertices, build_shape = self._rectangle_job(
                     ann['x1'], ann['y1'], ann['x2'], ann['y2']
                 )
-                mapped = {
-                    **ann,
-                    'mapped_shape': mapped_rect,
-                    'mapped': True
-                }
-
             elif ann_type == 'circle':
-                mapped_circle = self.map_circle(
+                vertices, build_shape = self._circle_job(
                     ann['center_x'], ann['center_y'], ann['radius']
                 )
-                mapped = {
-                    **ann,
-                    'mapped_shape': mapped_circle,
-                    'mapped': True
-                }
-
             elif ann_type == 'polygon':
-                mapped_poly = self.map_polygon(ann['points'])
-                mapped = {
+                vertices, build_shape = self._polygon_job(ann['points'])
+            else:
+                print(f"警告: 不支持的标注类型 '{ann_type}'，跳过")
+                continue
+
+            def build(mapped, ann=ann, build_shape=build_shape):
+                return {
                     **ann,
-                    'mapped_shape': mapped_poly,
+                    'mapped_shape': build_shape(mapped),
                     'mapped': True
                 }
 
-            else:
-                print(f"警告: 不支持的标注类型 '{ann_type}'，跳过")
-                continue
+            jobs.append((vertices, build))
 
-            mapped_annotations.append(mapped)
+        # 所有顶点一次映射，第二遍按各自的区段组装结果
+        mapped_annotations = []
+        if jobs:
+            mapped = self.map_points(np.concatenate([vertices for vertices, _ in jobs]))
+            start = 0
+            for vertices, build in jobs:
+                end = start + len(vertices)
+                mapped_annotations.append(build(mapped[start:end]))
+                start = end
 
         output_data = {
             'image': annotations['image'],
@@ -202,8 +264,10 @@ class AnnotationMapper:
             'annotations': mapped_annotations
         }
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        # orjson 直接输出 UTF-8（中文标签不转义），numpy 数组/标量也可直接序列化
+        Path(output_path).write_bytes(
+            orjson.dumps(output_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        )
 
         print(f"已映射 {len(mapped_annotations)} 个标注到: {output_path}")
 
@@ -217,10 +281,12 @@ def main():
                        metavar=('X1', 'Y1', 'X2', 'Y2'), help='映射矩形框')
     parser.add_argument('-f', '--file', help='映射标注文件')
     parser.add_argument('-o', '--output', help='输出文件路径（用于文件模式）')
+    parser.add_argument('--device', choices=['cpu', 'cuda'], default='cpu',
+                       help='文件模式下大批量点的计算设备（cuda 需要 torch）')
 
     args = parser.parse_args()
 
-    mapper = AnnotationMapper(args.transform)
+    mapper = AnnotationMapper(args.transform, device=args.device)
 
     if args.point:
         # 映射单个点
@@ -8,16 +8,19 @@ def main():
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     reload = os.getenv("RELOAD", "").strip().lower() in {"1", "true", "yes", "y"}
+    # One worker by default (small-memory hosts, see docs/SERVER_TROUBLESHOOTING.md);
+    # WORKERS opts into more. --reload always supervises a single process.
+    workers = 1 if reload else int(os.getenv("WORKERS") or 1)
 
     uvicorn.run(
         "api.index:app",
         host=host,
         port=port,
         reload=reload,
+        workers=workers,
         log_level=os.getenv("LOG_LEVEL", "info"),
     )
 
 
 if __name__ == "__main__":
     main()
-
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import sys
 import os
+import logging
 
 sys.path.insert(0, os.path.dirname(__file__))
 
@@ -9,6 +10,9 @@ from backend.core.semantic_analyzer import SemanticAnalyzer
 from backend.core.layout_generator import LayoutGenerator
 import json
 
+logger = logging.getLogger(__name__)
+DEBUG = os.getenv("DEBUG") == "1"
+
 
 def test_pipeline():
     print("=" * 60)
@@ -65,9 +69,8 @@ def test_pipeline():
             return False
     except Exception as e:
         print(f"❌ CAD generation failed: {e}")
-        import traceback
-
-        traceback.print_exc()
+        if DEBUG:
+            logger.exception("CAD generation failed")
         return False
 
     print("\n" + "=" * 60)
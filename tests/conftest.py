@@ -0,0 +1,80 @@
+"""Shared fixtures for the NewDemoFacade test suite."""
+from __future__ import annotations
+
+import io
+import os
+import shutil
+from pathlib import Path
+from typing import Iterator
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import api.index as index
+
+DEMO_CASE_ID = "CASE_001"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _isolated_demo_cache(tmp_path_factory: pytest.TempPathFactory) -> Iterator[None]:
+    """Keep the parsed-demo `.npz` cache out of the shared `/tmp` location."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(index, "DEMO_CACHE_DIR", tmp_path_factory.mktemp("demo_cache"))
+        yield
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    """One `TestClient` (and one app startup) for the whole session.
+
+    Handlers read module globals such as `DEMO_DATA_DIR` per request, so tests can
+    still monkeypatch them while sharing this client.
+    """
+    with TestClient(index.app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def demo_jpg_bytes() -> bytes:
+    """A small red 64x32 JPEG, encoded once; tests write it wherever a demo image is needed."""
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 32), (255, 0, 0)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="session")
+def demo_case_id() -> str:
+    """The case id staged in `demo_data_dir`."""
+    return DEMO_CASE_ID
+
+
+@pytest.fixture(scope="session")
+def _demo_proto(tmp_path_factory: pytest.TempPathFactory, demo_jpg_bytes: bytes) -> Path:
+    """A prototype `demo_data` dir with one case (original, `_ortho.json`, `_ortho.jpg`), written once."""
+    proto = tmp_path_factory.mktemp("proto") / "demo_data"
+    proto.mkdir()
+    (proto / f"{DEMO_CASE_ID}_ortho.json").write_bytes(
+        orjson.dumps(
+            {
+                "shapes": [
+                    {
+                        "label": "window",
+                        "points": [[0, 0], [10, 0], [10, 10], [0, 10]],
+                    }
+                ]
+            }
+        )
+    )
+    # This is the image file `analyze_demo` reads for dimensions.
+    (proto / f"{DEMO_CASE_ID}_ortho.jpg").write_bytes(demo_jpg_bytes)
+    # The ORIGINAL photo, source of the `/thumb/orig/` thumbnail.
+    (proto / f"{DEMO_CASE_ID}.JPG").write_bytes(demo_jpg_bytes)
+    return proto
+
+
+@pytest.fixture
+def demo_data_dir(_demo_proto: Path, tmp_path: Path) -> Path:
+    """A per-test `demo_data` dir, hardlinked from the session prototype instead of rewritten."""
+    return Path(shutil.copytree(_demo_proto, tmp_path / "demo_data", copy_function=os.link))
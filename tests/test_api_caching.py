@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import api.index as index
+
+if TYPE_CHECKING:
+    from _pytest.monkeypatch import MonkeyPatch
+    from fastapi.testclient import TestClient
+
+
+def test_cases_etag_revalidates_to_304(client: TestClient) -> None:
+    """`/api/cases` should carry an ETag and answer a matching If-None-Match with an empty 304."""
+    resp = client.get("/api/cases")
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == index.API_CACHE_CONTROL
+    etag = resp.headers["etag"]
+
+    resp = client.get("/api/cases", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert resp.headers["cache-control"] == index.API_CACHE_CONTROL
+
+
+def test_analyze_demo_get_etag_revalidates_to_304(
+    client: TestClient, demo_data_dir: Path, demo_case_id: str, monkeypatch: MonkeyPatch
+) -> None:
+    """`GET /api/analyze_demo/{case_id}` should carry an ETag and answer a matching If-None-Match with an empty 304."""
+    monkeypatch.setattr(index, "DEMO_DATA_DIR", demo_data_dir)
+    url = f"/api/analyze_demo/{demo_case_id}"
+
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == index.API_CACHE_CONTROL
+    etag = resp.headers["etag"]
+
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+
+def test_analyze_demo_post_is_not_cached(
+    client: TestClient, demo_data_dir: Path, demo_case_id: str, monkeypatch: MonkeyPatch
+) -> None:
+    """`POST /api/analyze_demo` ignores If-None-Match and is not cacheable."""
+    monkeypatch.setattr(index, "DEMO_DATA_DIR", demo_data_dir)
+
+    etag = client.get(f"/api/analyze_demo/{demo_case_id}").headers["etag"]
+    resp = client.post("/api/analyze_demo", data={"case_id": demo_case_id}, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "no-store"
+    assert resp.json()["status"] == "success"
+
+
+def test_analyze_demo_etag_tracks_payload_version(
+    client: TestClient, demo_data_dir: Path, demo_case_id: str, monkeypatch: MonkeyPatch
+) -> None:
+    """Bumping `DEMO_PAYLOAD_VERSION` changes the ETag even though the demo files did not change."""
+    monkeypatch.setattr(index, "DEMO_DATA_DIR", demo_data_dir)
+    url = f"/api/analyze_demo/{demo_case_id}"
+
+    etag = client.get(url).headers["etag"]
+    monkeypatch.setattr(index, "DEMO_PAYLOAD_VERSION", index.DEMO_PAYLOAD_VERSION + 1)
+    index._load_demo.cache_clear()
+    try:
+        assert client.get(url).headers["etag"] != etag
+    finally:
+        # Don't leave a memoized result computed under the bumped version.
+        index._load_demo.cache_clear()
+
+
+def test_original_thumb_etag_revalidates_to_304(
+    client: TestClient, demo_data_dir: Path, demo_case_id: str, tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    """`/thumb/orig/` should serve a cacheable JPEG and answer a matching If-None-Match with an empty 304."""
+    monkeypatch.setattr(index, "DEMO_DATA_DIR", demo_data_dir)
+    monkeypatch.setattr(index, "THUMB_CACHE_DIR", tmp_path / "thumbs")
+    # Don't reuse a source located by an earlier test under the same case id.
+    monkeypatch.setattr(index, "_source_versions", {})
+    url = f"{index.THUMB_URL_PREFIX}/orig/{demo_case_id}.jpg"
+
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/jpeg"
+    assert resp.headers["cache-control"] == index.THUMB_CACHE_CONTROL
+    assert resp.content.startswith(b"\xff\xd8")
+    etag = resp.headers["etag"]
+
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+
+def test_precompressed_response_prefers_accepted_variant(tmp_path: Path) -> None:
+    """A `.br` sibling is served with Content-Encoding and Vary when the client accepts br."""
+    asset = tmp_path / "app.js"
+    asset.write_text("console.log(1);")
+    (tmp_path / "app.js.br").write_bytes(b"br-bytes")
+    (tmp_path / "app.js.gz").write_bytes(b"gz-bytes")
+
+    resp = index._precompressed_response(str(asset), "gzip, br")
+    assert resp is not None
+    assert resp.path == f"{asset}.br"
+    assert resp.headers["content-encoding"] == "br"
+    assert resp.headers["vary"] == "Accept-Encoding"
+
+
+def test_precompressed_response_falls_back_to_plain_file(tmp_path: Path) -> None:
+    """Without an accepted encoding the plain file is served, still with Vary set."""
+    asset = tmp_path / "app.js"
+    asset.write_text("console.log(1);")
+    (tmp_path / "app.js.br").write_bytes(b"br-bytes")
+
+    resp = index._precompressed_response(str(asset), "identity")
+    assert resp is not None
+    assert resp.path == str(asset)
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["vary"] == "Accept-Encoding"
+
+
+def test_precompressed_response_none_without_variants(tmp_path: Path) -> None:
+    """Files with no precompressed sibling are left to the regular static handler."""
+    asset = tmp_path / "app.js"
+    asset.write_text("console.log(1);")
+
+    assert index._precompressed_response(str(asset), "gzip, br") is None
+
+
+def test_precompressed_response_skips_images(tmp_path: Path) -> None:
+    """Images never look for precompressed siblings, even if one happens to exist."""
+    image = tmp_path / "IMG_0001_ortho.jpg"
+    image.write_bytes(b"\xff\xd8")
+    (tmp_path / "IMG_0001_ortho.jpg.gz").write_bytes(b"gz-bytes")
+
+    assert index._precompressed_response(str(image), "gzip, br") is None
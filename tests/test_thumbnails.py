@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from core.thumbnails import evict_stale_versions, source_version
+
+
+def test_evict_stale_versions_keeps_other_cases(tmp_path: Path) -> None:
+    """Only `<prefix>_<version>.jpg` files are evicted, not other names the glob also matches."""
+    dst = tmp_path / "IMG_1_ortho_thumb_1a-2b.jpg"
+    stale = tmp_path / "IMG_1_ortho_thumb_19-2b.jpg"
+    other_case = tmp_path / "IMG_1_ortho_thumb_x_19-2b.jpg"
+    for path in (dst, stale, other_case):
+        path.write_bytes(b"jpg")
+
+    evict_stale_versions(dst, "IMG_1_ortho_thumb")
+
+    assert dst.exists()
+    assert not stale.exists()
+    assert other_case.exists()
+
+
+def test_source_version_changes_within_the_same_second(tmp_path: Path) -> None:
+    """Versions use nanosecond mtime and size, so sub-second edits get a new cache name."""
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"a")
+    os.utime(src, ns=(1_700_000_000_100_000_000, 1_700_000_000_100_000_000))
+    before = source_version(os.stat(src))
+
+    os.utime(src, ns=(1_700_000_000_200_000_000, 1_700_000_000_200_000_000))
+    assert source_version(os.stat(src)) != before
@@ -1,27 +1,33 @@
 import os
+import glob
 import logging
-from backend.core.image_processor import ImageProcessor
+from core.image_processor import ImageProcessor
 
 logging.basicConfig(level=logging.INFO)
 
+TEST_DATA_DIR = "backend/test_data"
+
 def test_ai_integration():
-    processor = ImageProcessor()
-    test_image = "backend/test_data/test_building.jpg"
-    
-    if not os.path.exists(test_image):
-        print(f"Test image not found at {test_image}")
+    test_images = sorted(glob.glob(os.path.join(TEST_DATA_DIR, "*.jpg")))
+
+    if not test_images:
+        print(f"No test images found in {TEST_DATA_DIR}")
         return
 
-    print(f"Processing {test_image} with SegFormer...")
-    processed_path, boxes, dims = processor.process(test_image)
-    
-    print(f"Processed image saved at: {processed_path}")
-    print(f"Image dimensions: {dims}")
-    print(f"Detected {len(boxes)} elements:")
-    for label, x, y, w, h in boxes[:10]:
-        print(f"  - {label}: [{x}, {y}, {w}, {h}]")
-    if len(boxes) > 10:
-        print(f"  ... and {len(boxes) - 10} more.")
+    # One processor for every image, so any model/device setup is paid once.
+    processor = ImageProcessor()
+    print(f"Processing {len(test_images)} image(s) with SegFormer...")
+    results = [(path, *processor.process(path)) for path in test_images]
+
+    for test_image, processed_path, boxes, dims in results:
+        print(f"\n{test_image}")
+        print(f"Processed image saved at: {processed_path}")
+        print(f"Image dimensions: {dims}")
+        print(f"Detected {len(boxes)} elements:")
+        for label, x, y, w, h in boxes[:10]:
+            print(f"  - {label}: [{x}, {y}, {w}, {h}]")
+        if len(boxes) > 10:
+            print(f"  ... and {len(boxes) - 10} more.")
 
 if __name__ == "__main__":
     test_ai_integration()
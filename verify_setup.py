@@ -1,53 +1,34 @@
-import cv2
-import numpy as np
-import os
 from fastapi.testclient import TestClient
-from backend.main import app
-import json
+import api.index as index
+import orjson
 
 
 def test_pipeline():
-    # 1. Create Dummy Image
-    img_path = "backend/test_data/test_building.jpg"
-    img = np.zeros((800, 600, 3), dtype=np.uint8)
-    # Draw a "building"
-    cv2.rectangle(img, (100, 100), (500, 700), (200, 200, 200), -1)
-    cv2.imwrite(img_path, img)
+    # 1. Pick a bundled demo case (the API has no upload route; it serves demo_data)
+    case_id = index.DEMO_FACADES[0][0]
 
-    assert os.path.exists(img_path)
-
-    # 2. Test Client
-    client = TestClient(app)
-
-    # 3. Send Request
-    with open(img_path, "rb") as f:
-        response = client.post(
-            "/analyze", files={"file": ("test_building.jpg", f, "image/jpeg")}
-        )
+    # 2. Test Client (context manager runs startup/shutdown and closes the connection pool)
+    with TestClient(index.app) as client:
+        # 3. Send Request
+        response = client.post("/api/analyze_demo", data={"case_id": case_id})
 
     # 4. Verify Response
     assert response.status_code == 200
     data = response.json()
 
-    print("Response Data:", json.dumps(data, indent=2))
+    print("Response Data:", orjson.dumps({k: v for k, v in data.items() if k != "masks"}, option=orjson.OPT_INDENT_2).decode())
 
     assert data["status"] == "success"
     assert "risk_report" in data
     assert "images" in data
-    assert "cad" in data
+    assert isinstance(data["masks"], list)
     assert data["risk_report"]["risk_soft_story"] in ["HIGH", "LOW"]
 
     # 5. Verify Artifacts
-    processed_url = data["images"]["processed"]
-    dxf_url = data["cad"]["dxf_url"]
-
-    # Convert URLs to local paths (assuming running from root)
-    # URL: /static/filename -> backend/static/filename
-    processed_path = f"backend{processed_url}"
-    dxf_path = f"backend{dxf_url}"
-
-    assert os.path.exists(processed_path)
-    assert os.path.exists(dxf_path)
+    # URL: /demo_data/filename -> DEMO_DATA_DIR/filename
+    for url in data["images"].values():
+        path = index.DEMO_DATA_DIR / url.removeprefix(f"{index.DEMO_DATA_URL_PREFIX}/")
+        assert path.is_file(), f"missing: {path}"
 
     print("Verification Successful!")
 